@@ -0,0 +1,174 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+import openpyxl
+from openpyxl.workbook.workbook import Workbook
+from data_extractor import DataGetter, Excel
+from data_structures import BranchInfo, Credentials, Process
+from journal import RunJournal
+from ledger import CompletionLedger
+from main import get_left_data
+from robot import Robot
+from simulation import NullNotifier, SimulatedDesktop
+from timing import Timer
+from utils import JournalReader, Utils
+
+
+def make_manifest(path: str, accounts: int, branches: int = 40, columns: int = 50, seed: int = None) -> None:
+    rand: random.Random = random.Random(seed)
+    workbook: Workbook = openpyxl.Workbook(write_only=True)
+
+    general_sheet = workbook.create_sheet()
+    general_sheet.append([])
+    general_sheet.append([None, 'Наименование', 'Счет'])
+    for i in range(max(accounts // 10, 1)):
+        general_sheet.append([None, f'Счет {i}', str(1000000 + i)])
+
+    branch_sheet = workbook.create_sheet()
+    branch_sheet.append([])
+    branch_sheet.append([])
+    branch_sheet.append([None] + [str(2000000 + i) for i in range(columns)])
+    for _ in range(max(accounts // columns, 1)):
+        branch_sheet.append([None] + [rand.randint(1, branches) if rand.random() > .1 else '-' for _ in range(columns)])
+    workbook.save(path)
+
+
+def make_journal(path: str, rows: int, append: bool = False) -> None:
+    with open(file=path, mode='a' if append else 'w', encoding='utf-8') as f:
+        if not append:
+            f.write('Дата\tИсполнитель\tОперация\tРезультат\n')
+        for i in range(rows):
+            if i % 100 == 0:
+                f.write(f'Начало записи 01.03.2023 10:{i // 6000 % 60:02}:{i // 100 % 60:02}\n')
+            f.write(f'01.03.2023\tПользователь {i % 20}\tРегламентная процедура номер {i % 50}\tВыполнено\n')
+
+
+def measure(func: Callable[[], Any], repeat: int, setup: Callable[[], Any] = None) -> Dict[str, float]:
+    timings: List[float] = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started: float = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {'median': statistics.median(timings), 'min': min(timings), 'max': max(timings), 'repeat': repeat}
+
+
+def run(accounts: int, journal_rows: int, tail_rows: int, repeat: int, seed: int) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest_path: str = os.path.join(tmp, 'manifest.xlsx')
+        make_manifest(path=manifest_path, accounts=accounts, seed=seed)
+
+        def parse_manifest() -> None:
+            with Excel(filename=manifest_path) as excel:
+                for _ in excel.general_data:
+                    pass
+                for _ in excel.branch_data:
+                    pass
+
+        results['excel_parse'] = measure(func=parse_manifest, repeat=repeat)
+
+        _date: datetime.datetime = datetime.datetime(2023, 7, 1)
+        DataGetter(_date=_date, manifest_path=manifest_path)
+        results['data_getter'] = measure(func=lambda: DataGetter(_date=_date, manifest_path=manifest_path), repeat=repeat)
+
+        data: List[BranchInfo] = DataGetter(_date=_date, manifest_path=manifest_path).info
+        payloads: List[Dict] = [b.to_payload() for b in data]
+        results['branch_info_post_init'] = measure(func=lambda: [BranchInfo(**payload) for payload in payloads], repeat=repeat)
+
+        with CompletionLedger(db_path=os.path.join(tmp, 'ledger.sqlite')) as ledger:
+            desktop: SimulatedDesktop = SimulatedDesktop(seed=seed)
+            robot: Robot = Robot(
+                credentials=Credentials(usr='robot', psw='robot'),
+                process=Process(name='COLVIR', path='colvir.exe'),
+                notifier=NullNotifier(),
+                data=data,
+                ledger=ledger,
+                journal=RunJournal(path=os.path.join(tmp, 'journal.jsonl')),
+                timer=Timer(),
+                desktop=desktop,
+                export_root=tmp,
+            )
+            names: List[Tuple[str, str]] = [(b.save_path, f'{10000 + i}_{b.file_name}') for i, b in enumerate(data)]
+            results['find_branch_info'] = measure(
+                func=lambda: [robot.find_branch_info(xls_path=path, xls_name=name) for path, name in names], repeat=repeat
+            )
+            robot.converter.close()
+            robot.journal.close()
+            desktop.close()
+
+            delivered_root: str = os.path.join(tmp, 'delivered')
+            for i, b in enumerate(data[::10]):
+                b.final_save_path = os.path.join(delivered_root, str(i))
+                os.makedirs(b.final_save_path, exist_ok=True)
+                full_path: str = os.path.join(b.final_save_path, b.final_name)
+                with open(file=full_path, mode='wb') as f:
+                    f.truncate(32 * 1024)
+                ledger.record(path=full_path)
+            results['get_left_data'] = measure(func=lambda: get_left_data(data=data, ledger=ledger), repeat=repeat)
+
+        journal_path: str = os.path.join(tmp, 'journal.txt')
+        make_journal(path=journal_path, rows=journal_rows)
+        results['text_to_dicts'] = measure(func=lambda: Utils.text_to_dicts(file_path=journal_path), repeat=repeat)
+        reader: JournalReader = JournalReader(file_path=journal_path, columns=['Исполнитель', 'Операция'], contains='номер 7')
+        list(reader.tail())
+        results['journal_tail'] = measure(func=lambda: list(reader.tail()), repeat=repeat,
+                                          setup=lambda: make_journal(path=journal_path, rows=tail_rows, append=True))
+
+        for name, result in results.items():
+            result['items'] = {'excel_parse': accounts, 'text_to_dicts': journal_rows, 'journal_tail': tail_rows}.get(name, len(data))
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    regressions: List[str] = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio: float = result['median'] / baseline[name]['median'] if baseline[name]['median'] else 1.
+        status: str = 'REGRESSION' if ratio > 1 + tolerance else 'ok'
+        print(f"{name}\t{baseline[name]['median']:.4f}s -> {result['median']:.4f}s\tx{ratio:.2f}\t{status}")
+        if status != 'ok':
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Benchmark planning and bookkeeping hot paths')
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--journal-rows', type=int, default=100000)
+    parser.add_argument('--tail-rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=.2)
+    args: argparse.Namespace = parser.parse_args()
+
+    results: Dict[str, Dict] = run(accounts=args.accounts, journal_rows=args.journal_rows, tail_rows=args.tail_rows, repeat=args.repeat, seed=args.seed)
+    for name, result in results.items():
+        print(f"{name}\t{result['items']} items\tmedian {result['median']:.4f}s\tmin {result['min']:.4f}s")
+
+    with open(file=args.output, mode='w', encoding='utf-8') as f:
+        json.dump({'python': platform.python_version(), 'node': platform.node(), 'accounts': args.accounts,
+                   'results': results}, f, ensure_ascii=False, indent=2)
+
+    if not args.baseline:
+        return
+    with open(file=args.baseline, mode='r', encoding='utf-8') as f:
+        baseline: Dict[str, Dict] = json.load(f)['results']
+    if compare(results=results, baseline=baseline, tolerance=args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,149 @@
 import os
+import queue
+import re
+import threading
+import time
+from typing import Dict, List
 import requests
 from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+PROGRESS_PATTERN = re.compile(r'^\d+/\d+')
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate: float = rate
+        self.capacity: int = capacity
+        self.tokens: float = capacity
+        self.updated_at: float = time.monotonic()
+
+    def acquire(self) -> None:
+        while True:
+            now: float = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            time.sleep((1 - self.tokens) / self.rate)
 
 
 class TelegramNotifier:
-    def __init__(self, chat_id: str, session: requests.Session, token: str = None, retries: int = 5):
+    def __init__(self, chat_id: str, session: requests.Session, token: str = None, retries: int = 5,
+                 api_url: str = None, rate: float = 1., burst: int = 5, coalesce_window: float = 10.,
+                 queue_size: int = 1000, timeout: float = 10.):
         token: str = os.getenv('TOKEN') if not token else token
         chat_id: str = chat_id
-        self.api_url = f'https://api.telegram.org/bot{token}/sendMessage'
-        self.api_params = {'chat_id': chat_id, 'parse_mode': 'Markdown'}
+        self.api_url = api_url if api_url else f'https://api.telegram.org/bot{token}/sendMessage'
+        self.api_params = {'chat_id': chat_id}
         self.retries = retries
+        self.timeout: float = timeout
         self.session = session
-        self.session.mount("http://", HTTPAdapter(max_retries=self.retries))
+        adapter: HTTPAdapter = HTTPAdapter(max_retries=Retry(
+            total=self.retries, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=None, respect_retry_after_header=True
+        ))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.bucket: TokenBucket = TokenBucket(rate=rate, capacity=burst)
+        self.coalesce_window: float = coalesce_window
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.pending: Dict[str, str] = {}
+        self.sent: int = 0
+        self.coalesced: int = 0
+        self.dropped: int = 0
+        self.failed: int = 0
+        self.thread: threading.Thread = threading.Thread(target=self._loop, name='telegram-notifier', daemon=True)
+        self.thread.start()
+
+    def __enter__(self) -> 'TelegramNotifier':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @staticmethod
+    def get_progress_key(message: str) -> str or None:
+        if not PROGRESS_PATTERN.match(message):
+            return None
+        return re.sub(r'\d+', '#', message)
+
+    @staticmethod
+    def split_message(message: str, max_length: int = MAX_MESSAGE_LENGTH) -> List[str]:
+        chunks: List[str] = []
+        chunk: str = ''
+        for line in message.splitlines(keepends=True):
+            while len(line) > max_length:
+                if chunk:
+                    chunks.append(chunk)
+                    chunk = ''
+                chunks.append(line[:max_length])
+                line = line[max_length:]
+            if len(chunk) + len(line) > max_length:
+                chunks.append(chunk)
+                chunk = ''
+            chunk += line
+        if chunk or not chunks:
+            chunks.append(chunk)
+        return chunks
+
+    def send_notification(self, message: str) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout: float = 60.) -> None:
+        if not self.thread.is_alive():
+            return
+        self.queue.put(None)
+        self.thread.join(timeout=timeout)
+
+    def _loop(self) -> None:
+        flush_at: float or None = None
+        while True:
+            wait: float or None = max(flush_at - time.monotonic(), 0.) if flush_at is not None else None
+            try:
+                message: str or None = self.queue.get(timeout=wait)
+            except queue.Empty:
+                self._flush()
+                flush_at = None
+                continue
+            if message is None:
+                self._flush()
+                return
+
+            key: str or None = self.get_progress_key(message=message)
+            if key is None:
+                self._flush()
+                flush_at = None
+                self._post(message=message)
+                continue
+            if key in self.pending:
+                self.coalesced += 1
+            self.pending[key] = message
+            if flush_at is None:
+                flush_at = time.monotonic() + self.coalesce_window
+
+    def _flush(self) -> None:
+        messages: List[str] = list(self.pending.values())
+        self.pending.clear()
+        for message in messages:
+            self._post(message=message)
 
-    def send_notification(self, message: str) -> requests.models.Response:
-        return self.session.post(self.api_url, params=self.api_params, json={'text': message})
+    def _post(self, message: str) -> None:
+        for chunk in self.split_message(message=message):
+            self.bucket.acquire()
+            try:
+                response: requests.Response = self.session.post(self.api_url, params=self.api_params, json={'text': chunk},
+                                                                timeout=self.timeout)
+                response.raise_for_status()
+                self.sent += 1
+            except requests.RequestException as e:
+                self.failed += 1
+                print(f'could not send notification: {e}')
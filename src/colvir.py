@@ -1,26 +1,136 @@
-import datetime
+import re
+import threading
+import time
 from time import sleep
-from typing import List
-import psutil
+from typing import Any, Callable, Dict, List
 from pywinauto import Desktop, Application, WindowSpecification
-from pywinauto.application import TimeoutError as AppTimeoutError
+from pywinauto.application import AppStartError, ProcessNotFoundError, TimeoutError as AppTimeoutError
 from pywinauto.base_wrapper import ElementNotEnabled, ElementNotVisible, InvalidElement
 from pywinauto.controls.hwndwrapper import DialogWrapper
 from pywinauto.findbestmatch import MatchError
 from pywinauto.findwindows import ElementNotFoundError, ElementAmbiguousError, WindowAmbiguousError, WindowNotFoundError
 from pywinauto.timings import TimeoutError as TimingsTimeoutError
-from data_structures import Credentials, Process, Date, BranchInfo
+from data_structures import Credentials, Process, BranchInfo, Period
+from process_registry import ProcessRegistry, registry as default_registry
+from timing import Timer
 from utils import Utils
 
+LAUNCH_ERRORS = (ElementNotFoundError, TimingsTimeoutError, ElementNotEnabled, ElementAmbiguousError,
+                 ElementNotVisible, InvalidElement, WindowAmbiguousError, WindowNotFoundError,
+                 MatchError, AppTimeoutError, AppStartError, ProcessNotFoundError, RuntimeError)
+WAIT_ERRORS = (ElementNotFoundError, ElementNotEnabled, ElementNotVisible, InvalidElement,
+               WindowNotFoundError, MatchError)
+
+
+def normalize_date(text: str) -> str:
+    return '.'.join(str(int(part)) for part in re.findall(r'\d+', text))
+
+
+class Waiter:
+    def __init__(self, initial_interval: float = .05, max_interval: float = .5, factor: float = 1.5,
+                 timeout: float = 60.) -> None:
+        self.initial_interval: float = initial_interval
+        self.max_interval: float = max_interval
+        self.factor: float = factor
+        self.timeout: float = timeout
+        self.timings: Dict[str, List[float]] = {}
+
+    def until(self, name: str, condition: Callable[[], Any], timeout: float = None) -> Any:
+        timeout = timeout if timeout is not None else self.timeout
+        started: float = time.monotonic()
+        deadline: float = started + timeout
+        interval: float = self.initial_interval
+        while True:
+            try:
+                result: Any = condition()
+            except WAIT_ERRORS:
+                result = None
+            now: float = time.monotonic()
+            if result:
+                self.timings.setdefault(name, []).append(now - started)
+                return result
+            if now >= deadline:
+                self.timings.setdefault(name, []).append(now - started)
+                raise TimingsTimeoutError(f'{name} not ready after {timeout}s')
+            sleep(min(interval, deadline - now))
+            interval = min(interval * self.factor, self.max_interval)
+
+    def exists(self, name: str, spec: WindowSpecification, timeout: float = None) -> WindowSpecification:
+        return self.until(name=name, condition=lambda: spec.exists(timeout=0) and spec, timeout=timeout)
+
+    def gone(self, name: str, spec: WindowSpecification, timeout: float = None) -> None:
+        self.until(name=name, condition=lambda: not spec.exists(timeout=0), timeout=timeout)
+
+    def enabled(self, name: str, spec: WindowSpecification, timeout: float = None) -> DialogWrapper:
+        def condition() -> DialogWrapper or None:
+            wrapper: DialogWrapper = spec.wrapper_object()
+            return wrapper if wrapper.is_visible() and wrapper.is_enabled() else None
+        return self.until(name=name, condition=condition, timeout=timeout)
+
+    def text(self, name: str, spec: WindowSpecification, value: str, timeout: float = None,
+             normalize: Callable[[str], str] = str.strip) -> None:
+        self.until(name=name, condition=lambda: normalize(spec.wrapper_object().window_text()) == normalize(value), timeout=timeout)
+
+    def set_text(self, name: str, spec: WindowSpecification, text: str, timeout: float = None,
+                 normalize: Callable[[str], str] = str.strip) -> None:
+        self.enabled(name=name, spec=spec, timeout=timeout).set_text(text=text)
+        self.text(name=f'{name} text', spec=spec, value=text, timeout=timeout, normalize=normalize)
+
+    def click(self, name: str, spec: WindowSpecification, timeout: float = None) -> None:
+        self.enabled(name=name, spec=spec, timeout=timeout).click()
+
+    def report(self) -> str:
+        lines: List[str] = []
+        for name, timings in sorted(self.timings.items()):
+            lines.append(f'{name}\t{len(timings)}\tavg {sum(timings) / len(timings):.2f}s\tmax {max(timings):.2f}s')
+        return '\n'.join(lines)
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = 5, cooldown: float = 5 * 60) -> None:
+        self.threshold: int = threshold
+        self.cooldown: float = cooldown
+        self.failures: int = 0
+        self.opened_at: float or None = None
+        self.lock: threading.Lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        with self.lock:
+            return self.opened_at is not None and time.monotonic() - self.opened_at < self.cooldown
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class LaunchState:
+    LAUNCH = 'launch'
+    LOGIN = 'login'
+    ATTACH = 'attach'
+    CONFIRM_WARNING = 'confirm_warning'
+    CHOOSE_MODE = 'choose_mode'
+    RUN_ACTION = 'run_action'
+    DONE = 'done'
+
 
 class Colvir:
     def __init__(self, pids: List[int], restricted_pids: List[int],
-                 credentials: Credentials, process: Process, data: BranchInfo) -> None:
+                 credentials: Credentials, process: Process, data: BranchInfo,
+                 breaker: CircuitBreaker = None, waiter: Waiter = None, timer: Timer = None,
+                 registry: ProcessRegistry = None, max_attempts: int = 3, backoff: float = 5.) -> None:
         self.credentials: Credentials = credentials
         self.process_name: str = process.name
         self.process_path: str = process.path
 
         self.pid: int or None = None
+        self.launched_pid: int or None = None
         self.pids: List[int] = pids
         self.restricted_pids: List[int] = restricted_pids
 
@@ -28,91 +138,121 @@ class Colvir:
         self.app: Application or None = None
 
         self.branch_info: BranchInfo = data
-        self.date: Date = Date(start=data.date_from, end=data.date_to)
-        self.date_start: str = self.date.start.strftime('%d.%m.%y')
-        self.date_end: str = self.date.end.strftime('%d.%m.%y')
-
-        self._date: datetime.datetime = datetime.datetime.strptime(self.date_end, '%d.%m.%y')
+        self.period: Period = data.period
+        self.date_start: str = self.period.colvir_start
+        self.date_end: str = self.period.colvir_end
 
         self.utils = Utils()
 
+        self.breaker: CircuitBreaker = breaker if breaker else CircuitBreaker()
+        self.waiter: Waiter = waiter if waiter else Waiter()
+        self.timer: Timer = timer if timer else Timer()
+        self.registry: ProcessRegistry = registry if registry else default_registry
+        self.max_attempts: int = max_attempts
+        self.backoff: float = backoff
+
     def get_current_pid(self) -> int:
-        res: int or None = None
-        for proc in psutil.process_iter():
-            if self.process_name in proc.name() \
-                    and proc.pid not in self.pids \
-                    and proc.pid not in self.restricted_pids:
-                res = proc.pid
-        return res
-
-    def open(self) -> None:
-        try:
-            Application(backend='win32').start(cmd_line=self.process_path)
+        pids: List[int] = self.registry.find(name=self.process_name, exclude=set(self.pids) | set(self.restricted_pids))
+        return pids[-1] if pids else None
+
+    def get_session_pid(self) -> int or None:
+        if self.launched_pid is None:
+            return self.get_current_pid()
+        for pid in [self.launched_pid] + self.registry.track_children(pid=self.launched_pid):
+            name: str or None = self.registry.get_name(pid=pid)
+            if name and self.process_name in name and self.registry.is_alive(pid=pid):
+                return pid
+        return self.get_current_pid()
+
+    def open(self) -> bool:
+        for attempt in range(1, self.max_attempts + 1):
+            if attempt > 1:
+                sleep(self.backoff * 2 ** (attempt - 2))
+            if self.breaker.is_open():
+                print(f'{self.breaker.failures} consecutive login failures, '
+                      f'not launching {self.branch_info.action} {self.branch_info.branch}')
+                return False
+
+            state: str = LaunchState.LAUNCH
+            try:
+                while state != LaunchState.DONE:
+                    with self.timer.span(stage=state, branch_info=self.branch_info, attempt=attempt):
+                        state = self.step(state=state)
+            except LAUNCH_ERRORS as e:
+                print(f'{self.branch_info.action} {self.branch_info.branch} failed at {state} '
+                      f'(attempt {attempt}/{self.max_attempts}): {type(e).__name__} {e}')
+                if state in (LaunchState.LAUNCH, LaunchState.LOGIN):
+                    self.breaker.record_failure()
+                self.kill()
+                continue
+            print(self.pid)
+            return True
+        return False
+
+    def step(self, state: str) -> str:
+        if state == LaunchState.LAUNCH:
+            app: Application = Application(backend='win32').start(cmd_line=self.process_path)
+            self.launched_pid = app.process
+            self.registry.track(pid=self.launched_pid)
+            return LaunchState.LOGIN
+        if state == LaunchState.LOGIN:
             self.login()
-        except (ElementNotFoundError, TimingsTimeoutError) as e:
-            self.retry()
-            return
-        self.pid: int = self.get_current_pid()
-        self.app: Application = Application(backend='win32').connect(process=self.pid)
-        sleep(2)
-        self.confirm_warning()
-        try:
+            self.breaker.record_success()
+            return LaunchState.ATTACH
+        if state == LaunchState.ATTACH:
+            self.pid = self.get_session_pid()
+            if self.pid is None:
+                raise RuntimeError('Colvir process not found after login')
+            self.registry.track(pid=self.pid)
+            self.app = Application(backend='win32').connect(process=self.pid)
+            return LaunchState.CONFIRM_WARNING
+        if state == LaunchState.CONFIRM_WARNING:
+            self.confirm_warning()
+            return LaunchState.CHOOSE_MODE
+        if state == LaunchState.CHOOSE_MODE:
             self.choose_mode()
-        except ElementNotFoundError:
-            self.retry()
-            return
-        try:
+            return LaunchState.RUN_ACTION
+        if state == LaunchState.RUN_ACTION:
             self.run_action()
-        except (ElementNotFoundError, TimingsTimeoutError, ElementNotEnabled, ElementAmbiguousError,
-                ElementNotVisible, InvalidElement, WindowAmbiguousError, WindowNotFoundError,
-                TimingsTimeoutError, MatchError, AppTimeoutError):
-            self.retry()
-            return
-        print(self.pid)
+            return LaunchState.DONE
+        raise ValueError(f'unknown launch state {state}')
 
     def run_action(self) -> None:
         mode = self.branch_info.mode
         action = self.branch_info.action
+        w: Waiter = self.waiter
 
-        filter_win: WindowSpecification = self.app.window(title='Фильтр')
-        filter_win.wait(wait_for='exists', timeout=60)
-        if mode == 'DD7':
-            filter_win['Edit6'].wrapper_object().set_text(text='0114')
-        elif mode == 'MCLIEN':
-            filter_win['Edit2'].wrapper_object().set_text(text='720914400947')
-        filter_win['OKButton'].wrapper_object().click()
+        with self.timer.span(stage='filter', branch_info=self.branch_info):
+            filter_win: WindowSpecification = w.exists(name='filter', spec=self.app.window(title='Фильтр'))
+            if mode == 'DD7':
+                w.set_text(name='filter branch', spec=filter_win['Edit6'], text='0114')
+            elif mode == 'MCLIEN':
+                w.set_text(name='filter client', spec=filter_win['Edit2'], text='720914400947')
+            w.click(name='filter ok', spec=filter_win['OKButton'])
 
-        sleep(1)
+            title: str = 'Субсчета ПС и лицевые счета клиентов' if mode == 'DD7' else 'Картотека физических и юридических лиц '
+            main_win: WindowSpecification = self.app.window(title=title, found_index=0)
+            w.enabled(name='main window', spec=main_win).send_keystrokes(keystrokes='{VK_F5}')
 
-        title: str = 'Субсчета ПС и лицевые счета клиентов' if mode == 'DD7' else 'Картотека физических и юридических лиц '
-        main_win: WindowSpecification = self.app.window(title=title, found_index=0)
-        main_win.wait(wait_for='exists', timeout=60)
-        main_win.wrapper_object().send_keystrokes(keystrokes='{VK_F5}')
+        with self.timer.span(stage='prepare_for_export', branch_info=self.branch_info):
+            self.prepare_for_export(file_name=self.branch_info.file_name, save_path=self.branch_info.save_path)
 
-        self.prepare_for_export(file_name=self.branch_info.file_name, save_path=self.branch_info.save_path)
-
-        settings_win: WindowSpecification = self.app.window(title='Параметры отчета ')
-        settings_win.wait(wait_for='exists', timeout=60)
+        settings_win: WindowSpecification = w.exists(name='settings', spec=self.app.window(title='Параметры отчета '))
 
         if action == 'S_CLI_013':
-            settings_win['Edit2'].set_text(text=self.date_end)
-            settings_win['Edit4'].set_text(text=self.branch_info.branch)
+            w.set_text(name='settings date end', spec=settings_win['Edit2'], text=self.date_end, normalize=normalize_date)
+            w.set_text(name='settings branch', spec=settings_win['Edit4'], text=self.branch_info.branch)
         else:
-            settings_win['Edit2'].wrapper_object().set_text(text=self.date_start)
-            sleep(.1)
-            settings_win['Edit4'].wrapper_object().set_text(text=self.date_end)
-            sleep(.1)
-            settings_win['Edit6'].wrapper_object().set_text(text=self.branch_info.branch)
-            sleep(.1)
+            w.set_text(name='settings date start', spec=settings_win['Edit2'], text=self.date_start, normalize=normalize_date)
+            w.set_text(name='settings date end', spec=settings_win['Edit4'], text=self.date_end, normalize=normalize_date)
+            w.set_text(name='settings branch', spec=settings_win['Edit6'], text=self.branch_info.branch)
             if action in ['Z_160_GL_020', 'Z_160_GL_003']:
                 edit_num: int = 5
                 if action == 'Z_160_GL_020':
                     edit_num = 10 if (self.branch_info.branch != '00' or ',' not in self.branch_info.account) else 18
-                settings_win[f'Edit{edit_num}'].wrapper_object().set_text(text=self.branch_info.account)
-                sleep(.1)
-                settings_win['СводныйCheckBox'].wrapper_object().click()
-        sleep(.1)
-        settings_win['OK'].wrapper_object().click()
+                w.set_text(name='settings account', spec=settings_win[f'Edit{edit_num}'], text=self.branch_info.account)
+                w.click(name='settings consolidated', spec=settings_win['СводныйCheckBox'])
+        w.click(name='settings ok', spec=settings_win['OK'])
 
     @staticmethod
     def is_active(app) -> bool:
@@ -125,11 +265,10 @@ class Colvir:
     def login(self) -> None:
         desktop: Desktop = Desktop(backend='win32')
         try:
-            login_win = desktop.window(title='Вход в систему')
-            login_win.wait(wait_for='exists', timeout=20)
-            login_win['Edit2'].wrapper_object().set_text(text=self.credentials.usr)
-            login_win['Edit'].wrapper_object().set_text(text=self.credentials.psw)
-            login_win['OK'].wrapper_object().click()
+            login_win: WindowSpecification = self.waiter.exists(name='login', spec=desktop.window(title='Вход в систему'), timeout=20)
+            self.waiter.enabled(name='login user', spec=login_win['Edit2']).set_text(text=self.credentials.usr)
+            self.waiter.enabled(name='login password', spec=login_win['Edit']).set_text(text=self.credentials.psw)
+            self.waiter.click(name='login ok', spec=login_win['OK'])
         except ElementAmbiguousError:
             windows: List[DialogWrapper] = Desktop(backend='win32').windows()
             for win in windows:
@@ -139,62 +278,42 @@ class Colvir:
             raise ElementNotFoundError
 
     def confirm_warning(self) -> None:
-        try:
-            dialog = self.app.window(title='Colvir Banking System', found_index=0)
-            dialog['OK'].wrapper_object().click()
-        except (MatchError, ElementNotFoundError):
-            self.retry()
-            return
+        dialog: WindowSpecification = self.waiter.exists(name='warning', spec=self.app.window(title='Colvir Banking System', found_index=0), timeout=20)
+        self.waiter.click(name='warning ok', spec=dialog['OK'])
 
     def choose_mode(self) -> None:
-        mode_win: WindowSpecification = self.app.window(title='Выбор режима')
-        mode_win['Edit2'].wrapper_object().set_text(text=self.branch_info.mode)
+        mode_win: WindowSpecification = self.waiter.exists(name='mode', spec=self.app.window(title='Выбор режима'), timeout=20)
+        self.waiter.set_text(name='mode code', spec=mode_win['Edit2'], text=self.branch_info.mode)
         mode_win['Edit2'].wrapper_object().send_keystrokes(keystrokes='{ENTER}')
         print('successfully logged in')
 
     def prepare_for_export(self, file_name: str, save_path: str) -> None:
         file_name: str = f'{self.pid}_{file_name}'
+        w: Waiter = self.waiter
         select_win: WindowSpecification = self.app.window(title='Выбор отчета')
-        select_win.wait(wait_for='exists', timeout=60)
+        w.enabled(name='select report', spec=select_win).send_keystrokes(keystrokes='{VK_F9}')
 
-        select_win.wrapper_object().send_keystrokes(keystrokes='{VK_F9}')
-        sleep(.2)
+        filter_win: WindowSpecification = w.exists(name='report filter', spec=self.app.window(title='Фильтр'))
+        w.set_text(name='report filter action', spec=filter_win['Edit4'], text=self.branch_info.action)
+        w.click(name='report filter ok', spec=filter_win['OK'])
+        w.gone(name='report filter closed', spec=filter_win)
 
-        filter_win: WindowSpecification = self.app.window(title='Фильтр')
-        filter_win.wait(wait_for='exists', timeout=60)
-        filter_win['Edit4'].wrapper_object().set_text(text=self.branch_info.action)
-        filter_win['OK'].wrapper_object().click()
+        w.click(name='preview', spec=select_win['Предварительный просмотр'])
+        w.click(name='export', spec=select_win['Экспорт в файл...'])
 
-        sleep(.5)
-
-        select_win['Предварительный просмотр'].wrapper_object().click()
-
-        select_win['Экспорт в файл...'].wrapper_object().click()
-        sleep(.1)
-
-        file_win: WindowSpecification = self.app.window(title='Файл отчета ')
-        file_win.wait(wait_for='exists', timeout=60)
-        file_win['Edit4'].wrapper_object().set_text(text=file_name)
-        sleep(.1)
-        file_win['Edit2'].wrapper_object().set_text(text=save_path)
-        sleep(.1)
+        file_win: WindowSpecification = w.exists(name='export file', spec=self.app.window(title='Файл отчета '))
+        w.set_text(name='export file name', spec=file_win['Edit4'], text=file_name)
+        w.set_text(name='export file path', spec=file_win['Edit2'], text=save_path)
         try:
             file_win['ComboBox'].wrapper_object().select(11)
         except (IndexError, ValueError):
             pass
 
-        file_win['OK'].wrapper_object().click()
+        w.click(name='export file ok', spec=file_win['OK'])
 
     def kill(self) -> None:
-        try:
-            p: psutil.Process = psutil.Process(pid=self.pid)
-            p.terminate()
-        except psutil.NoSuchProcess:
-            self.pid: int = self.get_current_pid()
-            p: psutil.Process = psutil.Process(self.pid)
-            p.terminate()
-        sleep(.5)
-
-    def retry(self) -> None:
-        self.kill()
-        self.open()
+        pids: List[int] = [pid for pid in {self.pid, self.launched_pid} if pid is not None]
+        self.registry.terminate(pids=pids, timeout=1.)
+        self.pid = None
+        self.launched_pid = None
+        self.app = None
@@ -0,0 +1,133 @@
+import collections
+import json
+import platform
+import time
+from dataclasses import dataclass, asdict
+from typing import Deque, Dict, List, TextIO
+import psutil
+from data_structures import get_osv_path
+from process_registry import ProcessRegistry, registry as default_registry
+
+
+@dataclass
+class ResourceSample:
+    cpu: float
+    memory: float
+    handles: int
+    failure_rate: float
+    outcomes: int
+
+
+class ConcurrencyController:
+    def __init__(self, initial: int = 20, min_concurrency: int = 4, max_concurrency: int = 40, increase: int = 1,
+                 decrease: float = .5, max_cpu: float = 85., max_memory: float = 85., max_handles: int = 150000,
+                 max_failure_rate: float = .2, window: int = 20, min_outcomes: int = 5, interval: float = 30.,
+                 registry: ProcessRegistry = None, path: str = get_osv_path(name='concurrency.jsonl')) -> None:
+        self.min_concurrency: int = max(min_concurrency, 1)
+        self.max_concurrency: int = max(max_concurrency, self.min_concurrency)
+        self.initial: int = min(max(initial, self.min_concurrency), self.max_concurrency)
+        self.increase: int = increase
+        self.decrease: float = decrease
+        self.max_cpu: float = max_cpu
+        self.max_memory: float = max_memory
+        self.max_handles: int = max_handles
+        self.max_failure_rate: float = max_failure_rate
+        self.min_outcomes: int = min_outcomes
+        self.interval: float = interval
+        self.registry: ProcessRegistry = registry if registry else default_registry
+        self.path: str or None = path
+        self.file: TextIO or None = None
+
+        self.outcomes: Deque[bool] = collections.deque(maxlen=window)
+        self.adjusted_at: float = time.monotonic()
+        self.adjustments: List[Dict] = []
+        psutil.cpu_percent(interval=None)
+
+    def __enter__(self) -> 'ConcurrencyController':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def record(self, success: bool) -> None:
+        self.outcomes.append(success)
+
+    def count_handles(self) -> int:
+        handles: int = 0
+        for process in list(self.registry.tracked.values()) + [psutil.Process()]:
+            try:
+                handles += process.num_handles() if hasattr(process, 'num_handles') else process.num_fds()
+            except psutil.Error:
+                continue
+        return handles
+
+    def sample(self) -> ResourceSample:
+        failures: int = sum(1 for success in self.outcomes if not success)
+        return ResourceSample(
+            cpu=psutil.cpu_percent(interval=None),
+            memory=psutil.virtual_memory().percent,
+            handles=self.count_handles(),
+            failure_rate=failures / len(self.outcomes) if self.outcomes else 0.,
+            outcomes=len(self.outcomes),
+        )
+
+    def get_pressure(self, sample: ResourceSample) -> List[str]:
+        reasons: List[str] = []
+        if sample.cpu > self.max_cpu:
+            reasons.append(f'cpu {sample.cpu:.0f}% > {self.max_cpu:.0f}%')
+        if sample.memory > self.max_memory:
+            reasons.append(f'memory {sample.memory:.0f}% > {self.max_memory:.0f}%')
+        if sample.handles > self.max_handles:
+            reasons.append(f'handles {sample.handles} > {self.max_handles}')
+        if sample.outcomes >= self.min_outcomes and sample.failure_rate > self.max_failure_rate:
+            reasons.append(f'failure rate {sample.failure_rate:.0%} > {self.max_failure_rate:.0%}')
+        return reasons
+
+    def adjust(self, concurrency: int, in_flight: int) -> int:
+        now: float = time.monotonic()
+        if now - self.adjusted_at < self.interval:
+            return concurrency
+        self.adjusted_at = now
+
+        sample: ResourceSample = self.sample()
+        reasons: List[str] = self.get_pressure(sample=sample)
+        if reasons:
+            target: int = max(int(concurrency * self.decrease), self.min_concurrency)
+            self.outcomes.clear()
+        elif in_flight == concurrency:
+            target: int = min(concurrency + self.increase, self.max_concurrency)
+            reasons.append('saturated without pressure')
+        else:
+            target: int = concurrency
+
+        if target != concurrency:
+            self.log(previous=concurrency, target=target, in_flight=in_flight, sample=sample, reasons=reasons)
+        return target
+
+    def log(self, previous: int, target: int, in_flight: int, sample: ResourceSample, reasons: List[str]) -> None:
+        print(f'concurrency {previous} -> {target} ({", ".join(reasons)}; in flight {in_flight}, cpu {sample.cpu:.0f}%, '
+              f'memory {sample.memory:.0f}%, handles {sample.handles}, failure rate {sample.failure_rate:.0%})')
+        record: Dict = {'ts': time.time(), 'host': platform.node(), 'from': previous, 'to': target, 'in_flight': in_flight,
+                        'reasons': reasons, **asdict(sample)}
+        self.adjustments.append(record)
+        if not self.path:
+            return
+        try:
+            if self.file is None:
+                self.file = open(file=self.path, mode='a', encoding='utf-8')
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.file.flush()
+        except OSError as e:
+            print(f'could not log concurrency adjustment to {self.path}: {e}')
+            self.path = None
+
+    def report(self) -> str:
+        if not self.adjustments:
+            return f'concurrency unchanged at {self.initial}'
+        targets: List[int] = [record['to'] for record in self.adjustments]
+        return f'concurrency {self.initial} -> {targets[-1]}, {len(targets)} adjustments, range {min(targets)}-{max(targets)}'
@@ -1,52 +1,103 @@
 import calendar
 import datetime
+import hashlib
 import os
-from typing import List, Tuple, Any, Dict, Set
+import pickle
+from typing import List, Tuple, Any, Dict, Set, Iterator
 import openpyxl
 from openpyxl.workbook.workbook import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
-from data_structures import Dimension, BranchInfo
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+from data_structures import BranchInfo, JobFactory
 
 
 class Excel:
     def __init__(self, filename: str) -> None:
-        self._workbook: Workbook = openpyxl.load_workbook(filename=filename, data_only=True)
-
-        self._general_sheet: Worksheet = self._workbook.worksheets[0]
-        self._branch_sheet: Worksheet = self._workbook.worksheets[1]
-
-        self._general_dim: Dimension = Dimension(x=self._general_sheet.max_column, y=self._general_sheet.max_row)
-        self._branch_dim: Dimension = Dimension(x=self._branch_sheet.max_column, y=self._branch_sheet.max_row)
-
-        self._general_rows: List[Tuple[Any]] = list(self._general_sheet.iter_rows(3, self._general_dim.y, 2, self._general_dim.x, values_only=True))
-        self._branch_cols: List[Tuple[Any]] = list(self._branch_sheet.iter_cols(2, self._branch_dim.x, 3, self._branch_dim.y, values_only=True))
-
-        self.general_data: List[BranchInfo] = self._get_general_data()
-        self.branch_data: List[BranchInfo] = self._get_branch_data()
-
-    def _get_general_data(self) -> List[BranchInfo]:
-        return [BranchInfo(branch='00', account=cells[1], account_name=cells[0]) for cells in self._general_rows if any(cells)]
-
-    def _get_branch_data(self) -> List[BranchInfo]:
-        infos: List[BranchInfo] = []
-        for col in self._branch_cols:
-            for cell in col[1::]:
-                if cell == '-':
+        self._workbook: Workbook = openpyxl.load_workbook(filename=filename, read_only=True, data_only=True)
+
+        self._general_sheet: ReadOnlyWorksheet = self._workbook.worksheets[0]
+        self._branch_sheet: ReadOnlyWorksheet = self._workbook.worksheets[1]
+
+    def __enter__(self) -> 'Excel':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._workbook.close()
+
+    @property
+    def general_data(self) -> Iterator[BranchInfo]:
+        for cells in self._general_sheet.iter_rows(min_row=3, min_col=2, max_col=3, values_only=True):
+            if not any(cells):
+                continue
+            yield BranchInfo(branch='00', account=cells[1], account_name=cells[0])
+
+    @property
+    def branch_data(self) -> Iterator[BranchInfo]:
+        rows: Iterator[Tuple[Any]] = self._branch_sheet.iter_rows(min_row=3, min_col=2, values_only=True)
+        accounts: Tuple[Any] = next(rows, ())
+        for row in rows:
+            for account, cell in zip(accounts, row):
+                if account is None or cell is None or cell == '-':
                     continue
-                infos.append(BranchInfo(branch=f'{int(cell):02}', account=col[0]))
-        return infos
+                yield BranchInfo(branch=f'{int(cell):02}', account=account)
+
+
+class ManifestCache:
+    version: int = 1
+
+    def __init__(self, filename: str, cache_path: str = None) -> None:
+        self.filename: str = filename
+        self.cache_path: str = cache_path if cache_path else f'{filename}.cache'
+
+    def get_key(self) -> Tuple[int, int, str]:
+        stat: os.stat_result = os.stat(self.filename)
+        sha256 = hashlib.sha256()
+        with open(file=self.filename, mode='rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha256.update(chunk)
+        return stat.st_size, stat.st_mtime_ns, sha256.hexdigest()
+
+    def load(self) -> Tuple[List[BranchInfo], List[BranchInfo]]:
+        key: Tuple[int, int, str] = self.get_key()
+        cached: Dict or None = self._read()
+        if cached and cached['version'] == self.version and cached['key'] == key:
+            general_data: List[BranchInfo] = [BranchInfo(branch='00', account=account, account_name=account_name) for account, account_name in cached['general']]
+            branch_data: List[BranchInfo] = [BranchInfo(branch=branch, account=account) for branch, account in cached['branch']]
+            return general_data, branch_data
+
+        with Excel(filename=self.filename) as excel:
+            general_data: List[BranchInfo] = list(excel.general_data)
+            branch_data: List[BranchInfo] = list(excel.branch_data)
+
+        self._write({
+            'version': self.version,
+            'key': key,
+            'general': [(data.account, data.account_name) for data in general_data],
+            'branch': [(data.branch, data.account) for data in branch_data],
+        })
+        return general_data, branch_data
+
+    def _read(self) -> Dict or None:
+        try:
+            with open(file=self.cache_path, mode='rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            return None
 
-    @staticmethod
-    def _get_last_full(iterable) -> int:
-        sz: int = len(list(iterable))
+    def _write(self, cached: Dict) -> None:
+        tmp_path: str = f'{self.cache_path}.tmp'
         try:
-            return next(j for j, cells in enumerate(iterable) if not any(cells))
-        except StopIteration:
-            return sz
+            with open(file=tmp_path, mode='wb') as f:
+                pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f'could not write manifest cache {self.cache_path}: {e}')
 
 
 class DataGetter:
-    def __init__(self, _date: datetime.datetime = None) -> None:
+    def __init__(self, _date: datetime.datetime = None, manifest_path: str = None) -> None:
         function_data: Dict = {1: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004']}, 2: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004']}, 3: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004'], 'quarterly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_013', 'S_CLI_014']}, 4: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004']}, 5: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004']}, 6: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004'], 'quarterly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_013', 'S_CLI_014'], 'six_monthly': ['Z_160_GL_020', 'Z_160_GL_003']}, 7: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004']}, 8: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004']}, 9: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004'], 'quarterly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_013', 'S_CLI_014'], 'nine_monthly': ['Z_160_GL_020', 'Z_160_GL_003']}, 10: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004']}, 11: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004']}, 12: {'last_daily': ['Z_160_GL_020', 'Z_160_GL_003'], 'monthly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_003', 'S_CLI_004'], 'quarterly': ['Z_160_GL_020', 'Z_160_GL_003', 'S_CLI_013', 'S_CLI_014'], 'six_monthly': ['Z_160_GL_020', 'Z_160_GL_003'], 'yearly': ['Z_160_GL_020', 'Z_160_GL_003']}}
 
         today: datetime.datetime = _date if _date else datetime.datetime.now()
@@ -58,9 +109,9 @@ class DataGetter:
 
         self.info: List[BranchInfo] = []
 
-        excel: Excel = Excel(filename=rf'C:\Users\{os.getlogin()}\Desktop\ОСВ_филиалы_счета.xlsx')
-        general_data: List[BranchInfo] = excel.general_data
-        branch_data: List[BranchInfo] = excel.branch_data
+        if not manifest_path:
+            manifest_path = rf'C:\Users\{os.getlogin()}\Desktop\ОСВ_филиалы_счета.xlsx'
+        general_data, branch_data = ManifestCache(filename=manifest_path).load()
 
         unique_branches: List[str] = self.unique_list([data.branch for data in branch_data])
 
@@ -68,41 +119,17 @@ class DataGetter:
             date_to: str = self.get_day(day=calendar.monthrange(today.year, month)[1], month=month, year=year)
             date_from: str = date_to if period == 'last_daily' else self.get_day(month=self.get_first_days(month)[period], year=year)
 
+            factory: JobFactory = JobFactory(date_from=date_from, date_to=date_to)
             for function in functions:
                 if function in ['S_CLI_003', 'S_CLI_004', 'S_CLI_013', 'S_CLI_014']:
                     for branch in unique_branches:
-                        self.info.append(BranchInfo(
-                            branch=branch,
-                            date_from=date_from,
-                            date_to=date_to,
-                            action=function,
-                        ))
+                        self.info.append(factory.make(action=function, branch=branch))
                     continue
                 if function == 'Z_160_GL_003':
-                    self.info.append(BranchInfo(
-                        branch='00',
-                        date_from=date_from,
-                        date_to=date_to,
-                        action=function,
-                    ))
+                    self.info.append(factory.make(action=function, branch='00'))
                     continue
-                for data in general_data:
-                    self.info.append(BranchInfo(
-                        account=data.account,
-                        branch=data.branch,
-                        date_from=date_from,
-                        date_to=date_to,
-                        action=function,
-                        account_name=data.account_name
-                    ))
-                for data in branch_data:
-                    self.info.append(BranchInfo(
-                        account=data.account,
-                        branch=data.branch,
-                        date_from=date_from,
-                        date_to=date_to,
-                        action=function,
-                    ))
+                self.info.extend(factory.make_many(action=function, data=general_data))
+                self.info.extend(factory.make_many(action=function, data=branch_data))
 
     @staticmethod
     def get_day(month: int, day: int = None, year: int = datetime.datetime.now().year) -> str:
@@ -1,8 +1,26 @@
 import datetime
+import functools
+import hashlib
 import os
 import platform
+import sys
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, List
+
+EXPORT_ROOTS: Dict[str, str] = {
+    'robot-2t': r'\\robot-7\c$\2txls',
+}
+
+
+OSV_ROOT: str = r'C:\Users\robot.ad\Desktop\osv'
+
+
+def get_export_root(node: str = None) -> str:
+    return EXPORT_ROOTS.get(node if node else platform.node(), r'C:\xls')
+
+
+def get_osv_path(name: str) -> str:
+    return rf'{OSV_ROOT}\{name}'
 
 
 @dataclass
@@ -17,28 +35,119 @@ class Process:
     path: str
 
 
-@dataclass(init=True)
-class Date:
-    start: str or datetime.datetime
-    end: str or datetime.datetime
+@dataclass
+class FilesInfo:
+    path: str
+    name: str
+    full_path: str or None = None
+    pid: int or None = None
 
     def __post_init__(self) -> None:
-        self.start = datetime.date.fromisoformat(self.start)
-        self.end = datetime.date.fromisoformat(self.end)
+        self.full_path: str = os.path.join(self.path, self.name)
+        pid: str = self.name[:self.name.find('_')]
+        self.pid = int(pid)
 
 
-@dataclass
-class ExcelInfo:
-    path: str
+RUSSIAN_MONTHS: Dict[int, str] = {1: 'январь', 2: 'февраль', 3: 'март', 4: 'апрель', 5: 'май', 6: 'июнь', 7: 'июль', 8: 'август', 9: 'сентябрь', 10: 'октябрь', 11: 'ноябрь', 12: 'декабрь'}
 
 
-@dataclass
-class Dimension:
-    x: int
-    y: int
+@dataclass(frozen=True)
+class Period:
+    date_from: str
+    date_to: str
+    start: datetime.date
+    end: datetime.date
+    date_diff: int
+    month_year: str
+    folder_name: str
+    date_end_str: str
+    colvir_start: str
+    colvir_end: str
 
 
-@dataclass
+@functools.lru_cache(maxsize=None)
+def get_period(date_from: str, date_to: str) -> Period:
+    start: datetime.date = datetime.date.fromisoformat(date_from)
+    end: datetime.date = datetime.date.fromisoformat(date_to)
+    month_year: str = f'{RUSSIAN_MONTHS[end.month]} {end.year}'
+    folder_names: Dict = {
+        1: rf'За {month_year}',
+        3: rf'За {BranchInfo.get_quarter(start)} квартал {start.year}',
+        6: rf'За {BranchInfo.get_year_half(start)} полугодие {start.year}',
+        9: rf'За 9 месяцев {start.year}',
+        12: rf'За {start.year} год'
+    }
+    return Period(
+        date_from=date_from,
+        date_to=date_to,
+        start=start,
+        end=end,
+        date_diff=(end - start).days,
+        month_year=month_year,
+        folder_name=folder_names.get(BranchInfo.diff_month(start=start, end=end)),
+        date_end_str=end.strftime('%d.%m.%Y'),
+        colvir_start=start.strftime('%d.%m.%y'),
+        colvir_end=end.strftime('%d.%m.%y'),
+    )
+
+
+@dataclass(frozen=True)
+class ReportLayout:
+    mode: str
+    save_path: str
+    export_save_path: str
+    final_save_path: str
+    file_name: str or None = None
+    file_suffix: str or None = None
+
+
+@functools.lru_cache(maxsize=None)
+def get_report_layout(action: str, date_from: str, date_to: str, general: bool) -> ReportLayout:
+    p: Period = get_period(date_from=date_from, date_to=date_to)
+    start, end = p.start, p.end
+    if p.folder_name is None:
+        raise KeyError(BranchInfo.diff_month(start=start, end=end))
+    file_name: str or None = None
+    file_suffix: str or None = None
+
+    if action == 'Z_160_GL_020':
+        save_path = rf'C:\xls\z_160_gl_020\{end.year} год\{p.month_year}'
+        save_path += rf'\{p.date_end_str}' if start == end else rf'\{p.folder_name}'
+        if general:
+            file_suffix = f'_{p.folder_name.lower()}.xls' if start.day != end.day else f'_{p.date_end_str}.xls'
+    elif action == 'Z_160_GL_003':
+        save_path = rf'C:\xls\z_160_gl_003\{start.year} год\{p.month_year}\Баланс ГК и обороты'
+        file_name = rf'{p.folder_name}.xls' if start.day != end.day else rf'{p.date_end_str}.xls'
+    elif action == 'S_CLI_003':
+        save_path = rf'C:\xls\s_cli_003\{start.year}'
+        if general:
+            file_name = f'Ведомость коррекции Книги регистрации клиентов_{RUSSIAN_MONTHS[start.month]} {start.year}.xls'
+        else:
+            save_path += rf'\{RUSSIAN_MONTHS[start.month].capitalize()}'
+            file_suffix = f'_{RUSSIAN_MONTHS[start.month]} {start.year}.xls'
+    elif action == 'S_CLI_004':
+        save_path = rf'C:\xls\s_cli_004\{start.year}\{RUSSIAN_MONTHS[start.month].capitalize()} {start.year}'
+        file_suffix = f'_{RUSSIAN_MONTHS[start.month]} {start.year}.xls'
+    elif action == 'S_CLI_013':
+        save_path = rf'C:\xls\s_cli_013\{start.year}\Книга регистрации клиентов за {BranchInfo.get_quarter(start)} квартал {start.year}'
+        file_suffix = f'_{BranchInfo.get_quarter(start)} кв {start.year}.xls'
+    elif action == 'S_CLI_014':
+        save_path = rf'C:\xls\s_cli_014\{start.year}\Книга регистрации счетов за {BranchInfo.get_quarter(start)} квартал {start.year}'
+        file_suffix = f'_{BranchInfo.get_quarter(start)} кв {start.year}.xls'
+    else:
+        raise ValueError(f'unknown action {action}')
+
+    return ReportLayout(
+        mode='MCLIEN' if action in ['S_CLI_003', 'S_CLI_013'] else 'DD7',
+        save_path=sys.intern(save_path),
+        export_save_path=sys.intern(save_path.replace(r'C:\xls', get_export_root(), 1)),
+        final_save_path=sys.intern(BranchInfo.get_final_save_path(save_path=save_path, action=action)),
+        file_name=file_name,
+        file_suffix=file_suffix,
+    )
+
+
+@dataclass(slots=True)
 class BranchInfo:
     branch: str
     account: str = None
@@ -54,15 +163,15 @@ class BranchInfo:
     final_save_path: str = None
 
     @staticmethod
-    def diff_month(start: datetime.datetime, end: datetime.datetime) -> int:
+    def diff_month(start: datetime.date, end: datetime.date) -> int:
         return end.month - start.month + 1
 
     @staticmethod
-    def get_quarter(d: datetime.datetime) -> int:
+    def get_quarter(d: datetime.date) -> int:
         return (d.month - 1) // 3 + 1
 
     @staticmethod
-    def get_year_half(d: datetime.datetime) -> int:
+    def get_year_half(d: datetime.date) -> int:
         return (d.month - 1) // 6 + 1
 
     def __post_init__(self) -> None:
@@ -70,81 +179,48 @@ class BranchInfo:
             self.account: str = str(self.account)
 
         if self.date_to is not None:
-            date_to: datetime.datetime = datetime.datetime.strptime(self.date_to, '%Y-%m-%d')
-            date_from: datetime.datetime = datetime.datetime.strptime(self.date_from, '%Y-%m-%d')
-            self.date_diff: int = (date_to - date_from).days
+            self.date_diff: int = get_period(date_from=self.date_from, date_to=self.date_to).date_diff
 
         if not self.action:
             return
 
-        self.mode: str = 'MCLIEN' if self.action in ['S_CLI_003', 'S_CLI_013'] else 'DD7'
-
-        russian_months: Dict = {1: 'январь', 2: 'февраль', 3: 'март', 4: 'апрель', 5: 'май', 6: 'июнь', 7: 'июль', 8: 'август', 9: 'сентябрь', 10: 'октябрь', 11: 'ноябрь', 12: 'декабрь'}
-        _date: datetime.datetime = datetime.datetime.strptime(self.date_to, '%Y-%m-%d')
-        date_end: datetime.datetime = _date
-        date_start: datetime.datetime = datetime.datetime.strptime(self.date_from, '%Y-%m-%d')
-        date_end_str: str = date_end.strftime('%d.%m.%Y')
-
-        month_year: str = f'{russian_months[_date.month]} {_date.year}'
-        folder_names: Dict = {
-            1: rf'За {month_year}',
-            3: rf'За {self.get_quarter(date_start)} квартал {date_start.year}',
-            6: rf'За {self.get_year_half(date_start)} полугодие {date_start.year}',
-            9: rf'За 9 месяцев {date_start.year}',
-            12: rf'За {date_start.year} год'
-        }
-        folder_name: str = folder_names[self.diff_month(start=date_start, end=date_end)]
-
-        if self.action == 'Z_160_GL_020':
-            self.save_path = rf'C:\xls\z_160_gl_020'
-            self.save_path += rf'\{_date.year} год\{month_year}'
-
-            if date_start == date_end:
-                self.save_path += rf'\{date_end_str}'
-            else:
-                self.save_path += rf'\{folder_name}'
-
-            if self.branch == '00':
-                if date_start.day != date_end.day:
-                    self.file_name = rf'{self.account_name}_{folder_name.lower()}.xls'
-                else:
-                    self.file_name = rf'{self.account_name}_{date_end_str}.xls'
-            else:
-                self.save_path += rf'\{self.account}'
-                self.file_name = f'{self.account}_{self.branch}.xls'
-        elif self.action == 'Z_160_GL_003':
-            self.save_path = rf'C:\xls\z_160_gl_003'
-            self.save_path += rf'\{date_start.year} год\{month_year}\Баланс ГК и обороты'
-
-            if date_start.day != date_end.day:
-                self.file_name = rf'{folder_name}.xls'
-            else:
-                self.file_name = rf'{date_end_str}.xls'
-        elif self.action == 'S_CLI_003':
-            self.save_path = rf'C:\xls\s_cli_003\{date_start.year}'
-            if self.branch == '00':
-                self.file_name = f'Ведомость коррекции Книги регистрации клиентов_' \
-                        f'{russian_months[date_start.month]} {date_start.year}.xls'
-            else:
-                self.file_name = f'{self.branch}_{russian_months[date_start.month]} {date_start.year}.xls'
-                self.save_path += rf'\{russian_months[date_start.month].capitalize()}'
-        elif self.action == 'S_CLI_004':
-            self.save_path = fr'C:\xls\s_cli_004'
-            self.save_path += rf'\{date_start.year}\{russian_months[date_start.month].capitalize()} {date_start.year}'
-            self.file_name = f'{self.branch}_{russian_months[date_start.month]} {date_start.year}.xls'
-        elif self.action == 'S_CLI_013':
-            self.save_path = rf'C:\xls\s_cli_013\{date_start.year}'
-            self.save_path += rf'\Книга регистрации клиентов за {self.get_quarter(date_start)} квартал {date_start.year}'
-            self.file_name = f'{self.branch}_{self.get_quarter(date_start)} кв {date_start.year}.xls'
-        elif self.action == 'S_CLI_014':
-            self.save_path = rf'C:\xls\s_cli_014\{date_start.year}'
-            self.save_path += rf'\Книга регистрации счетов за {self.get_quarter(date_start)} квартал {date_start.year}'
-            self.file_name = f'{self.branch}_{self.get_quarter(date_start)} кв {date_start.year}.xls'
+        layout: ReportLayout = get_report_layout(action=self.action, date_from=self.date_from, date_to=self.date_to,
+                                                 general=self.branch == '00')
+        self.mode = layout.mode
+        self.save_path = layout.export_save_path
+        self.final_save_path = layout.final_save_path
+
+        if layout.file_name:
+            self.file_name = layout.file_name
+        elif self.action == 'Z_160_GL_020' and self.branch == '00':
+            self.file_name = f'{self.account_name}{layout.file_suffix}'
+        elif self.action == 'Z_160_GL_020':
+            self.save_path = rf'{layout.export_save_path}\{self.account}'
+            self.final_save_path = rf'{layout.final_save_path}\{self.account}'
+            self.file_name = f'{self.account}_{self.branch}.xls'
+        else:
+            self.file_name = f'{self.branch}{layout.file_suffix}'
 
         self.final_name = self.file_name.replace('xls', 'xlsb')
-        self.final_save_path = self.get_final_save_path(save_path=self.save_path, action=self.action)
-        if platform.node() == 'robot-2t':
-            self.save_path = self.save_path.replace(r'C:\xls', r'\\robot-7\c$\2txls')
+
+    @property
+    def period(self) -> Period:
+        return get_period(date_from=self.date_from, date_to=self.date_to)
+
+    @property
+    def job_id(self) -> str:
+        identity: str = '|'.join(str(x) for x in (self.action, self.branch, self.account, self.account_name, self.date_from, self.date_to))
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+    def to_payload(self) -> Dict:
+        return {
+            'branch': self.branch,
+            'account': self.account,
+            'account_name': self.account_name,
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+            'action': self.action,
+        }
 
     @staticmethod
     def get_final_save_path(save_path, action):
@@ -166,3 +242,22 @@ class BranchInfo:
         }
 
         return save_path.replace(rf'C:\xls\{action.lower()}', save_paths[action])
+
+
+def get_period_path(prefix: str, data: List[BranchInfo], extension: str = 'jsonl') -> str:
+    period: str = max((b.date_to for b in data if b.date_to), default='unknown')[:7]
+    return get_osv_path(name=f'{prefix}_{period}.{extension}')
+
+
+class JobFactory:
+    def __init__(self, date_from: str, date_to: str) -> None:
+        self.date_from: str = sys.intern(date_from)
+        self.date_to: str = sys.intern(date_to)
+        self.period: Period = get_period(date_from=self.date_from, date_to=self.date_to)
+
+    def make(self, action: str, branch: str, account: str = None, account_name: str = None) -> BranchInfo:
+        return BranchInfo(branch=sys.intern(branch), account=account, account_name=account_name,
+                          date_from=self.date_from, date_to=self.date_to, action=action)
+
+    def make_many(self, action: str, data: List[BranchInfo]) -> List[BranchInfo]:
+        return [self.make(action=action, branch=b.branch, account=b.account, account_name=b.account_name) for b in data]
@@ -0,0 +1,180 @@
+import hashlib
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+from data_structures import get_osv_path
+
+
+@dataclass
+class DeliveryJob:
+    job_id: int
+    src_file: str
+    dst_file: str
+    remove_src: bool = True
+    attempts: int = 0
+
+
+@dataclass
+class DeliveryResult:
+    job: DeliveryJob
+    tag: Any
+    success: bool
+    error: str or None = None
+    duration: float = 0.
+    size: int = 0
+    checksum: str or None = None
+
+
+class DeliveryService:
+    def __init__(self, staging_root: str = get_osv_path(name='staging'), workers: int = 4,
+                 retries: int = 3, backoff: float = 5., chunk_size: int = 1 << 20) -> None:
+        self.staging_root: str = staging_root
+        self.workers_number: int = workers
+        self.retries: int = retries
+        self.backoff: float = backoff
+        self.chunk_size: int = chunk_size
+
+        self.executor: ThreadPoolExecutor or None = None
+        self.job_ids = itertools.count(1)
+        self.pending: Dict[int, Tuple[DeliveryJob, Any]] = {}
+        self.results: queue.Queue = queue.Queue()
+        self.lock: threading.Lock = threading.Lock()
+        self.idle: threading.Condition = threading.Condition(self.lock)
+        self.stopped: threading.Event = threading.Event()
+
+        self.counters: Dict[str, int] = {'submitted': 0, 'delivered': 0, 'failed': 0, 'retried': 0, 'bytes': 0}
+        self.durations: List[float] = []
+
+    def __enter__(self) -> 'DeliveryService':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def start(self) -> None:
+        if self.executor:
+            return
+        os.makedirs(self.staging_root, exist_ok=True)
+        self.stopped.clear()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers_number, thread_name_prefix='delivery')
+
+    def get_staging_path(self, name: str) -> str:
+        return os.path.join(self.staging_root, name)
+
+    def submit(self, src_file: str, dst_file: str, remove_src: bool = True, tag: Any = None) -> int:
+        self.start()
+        job: DeliveryJob = DeliveryJob(job_id=next(self.job_ids), src_file=src_file, dst_file=dst_file, remove_src=remove_src)
+        with self.lock:
+            self.pending[job.job_id] = (job, tag)
+            self.counters['submitted'] += 1
+        self.executor.submit(self.run, job)
+        return job.job_id
+
+    def run(self, job: DeliveryJob) -> None:
+        start: float = time.monotonic()
+        error: str or None = None
+        size, checksum = 0, None
+        while True:
+            job.attempts += 1
+            try:
+                size, checksum = self.copy(src_file=job.src_file, dst_file=job.dst_file)
+                error = None
+                break
+            except (OSError, ValueError) as e:
+                error = f'{type(e).__name__}: {e}'
+            if job.attempts > self.retries or self.stopped.is_set():
+                break
+            with self.lock:
+                self.counters['retried'] += 1
+            print(f'retrying delivery of {job.dst_file} ({job.attempts}/{self.retries}): {error}')
+            if self.stopped.wait(timeout=self.backoff * 2 ** (job.attempts - 1)):
+                break
+
+        if not error and job.remove_src:
+            try:
+                os.unlink(job.src_file)
+            except OSError as e:
+                print(f'could not remove staged file {job.src_file}: {e}')
+        self.finish(job=job, duration=time.monotonic() - start, error=error, size=size, checksum=checksum)
+
+    def copy(self, src_file: str, dst_file: str) -> Tuple[int, str]:
+        tmp_file: str = f'{dst_file}.{os.getpid()}_{threading.get_ident()}.part'
+        sha256 = hashlib.sha256()
+        size: int = 0
+        try:
+            os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+            with open(file=src_file, mode='rb') as src, open(file=tmp_file, mode='wb') as dst:
+                for chunk in iter(lambda: src.read(self.chunk_size), b''):
+                    sha256.update(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+                dst.flush()
+                os.fsync(dst.fileno())
+
+            if os.path.getsize(src_file) != size:
+                raise ValueError(f'{src_file} changed while it was being copied')
+            if os.path.getsize(tmp_file) != size:
+                raise ValueError(f'size mismatch for {tmp_file}: {os.path.getsize(tmp_file)} != {size}')
+            if self.get_checksum(file_path=tmp_file) != sha256.hexdigest():
+                raise ValueError(f'checksum mismatch for {tmp_file}')
+            os.replace(tmp_file, dst_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+            raise
+        return size, sha256.hexdigest()
+
+    def get_checksum(self, file_path: str) -> str:
+        sha256 = hashlib.sha256()
+        with open(file=file_path, mode='rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def finish(self, job: DeliveryJob, duration: float, error: str or None, size: int, checksum: str or None) -> None:
+        with self.lock:
+            _, tag = self.pending.pop(job.job_id)
+            self.durations.append(duration)
+            self.counters['failed' if error else 'delivered'] += 1
+            if not error:
+                self.counters['bytes'] += size
+            self.results.put(DeliveryResult(job=job, tag=tag, success=not error, error=error, duration=duration,
+                                            size=size, checksum=checksum))
+            self.idle.notify_all()
+
+    def drain(self) -> List[DeliveryResult]:
+        results: List[DeliveryResult] = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def join(self, timeout: float = None) -> bool:
+        with self.idle:
+            return self.idle.wait_for(lambda: not self.pending, timeout=timeout)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            metrics: Dict[str, Any] = dict(self.counters)
+            metrics['in_flight'] = len(self.pending)
+            durations: List[float] = sorted(self.durations)
+        metrics['avg_duration'] = sum(durations) / len(durations) if durations else 0.
+        metrics['max_duration'] = durations[-1] if durations else 0.
+        return metrics
+
+    def close(self) -> None:
+        if not self.executor:
+            return
+        self.join()
+        self.stopped.set()
+        self.executor.shutdown(wait=True)
+        self.executor = None
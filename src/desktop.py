@@ -0,0 +1,168 @@
+import os
+import shutil
+from dataclasses import dataclass
+from typing import Dict, List
+import openpyxl
+from openpyxl.workbook.workbook import Workbook
+from openpyxl.worksheet.worksheet import Worksheet
+from data_structures import BranchInfo, Credentials, Process
+from process_registry import ProcessRegistry, registry as default_registry
+from timing import Timer
+from xls_reader import XlsReader
+
+try:
+    import win32com.client as win32
+    from pywinauto import Application, handleprops
+    from pywinauto.application import ProcessNotFoundError
+    from pywinauto.controls.hwndwrapper import InvalidWindowHandle
+    from colvir import CircuitBreaker, Colvir, Waiter
+except ImportError:
+    win32 = Application = handleprops = ProcessNotFoundError = InvalidWindowHandle = None
+    CircuitBreaker = Colvir = Waiter = None
+
+
+class SessionState:
+    RUNNING = 'running'
+    READY = 'ready'
+    ERRORED = 'errored'
+    GONE = 'gone'
+
+
+@dataclass
+class SessionHandles:
+    app: Application
+    select_handle: int or None = None
+    errored: bool = False
+
+
+class SessionStateCache:
+    select_title: str = 'Выбор отчета'
+    error_pattern: str = r'(?s).*Ошибка при обработке.*'
+
+    def __init__(self, registry: ProcessRegistry, error_class_name: str = None, error_depth: int = None) -> None:
+        self.registry: ProcessRegistry = registry
+        self.sessions: Dict[int, SessionHandles] = {}
+        self.error_criteria: Dict = {'title_re': self.error_pattern}
+        if error_class_name:
+            self.error_criteria['class_name'] = error_class_name
+        if error_depth:
+            self.error_criteria['depth'] = error_depth
+
+    def forget(self, pid: int) -> None:
+        self.sessions.pop(pid, None)
+
+    def get_state(self, pid: int) -> str:
+        if not self.registry.is_alive(pid=pid):
+            self.forget(pid=pid)
+            return SessionState.GONE
+        try:
+            handles: SessionHandles or None = self.sessions.get(pid)
+            if handles is None:
+                handles = SessionHandles(app=Application(backend='win32').connect(process=pid))
+                self.sessions[pid] = handles
+            if handles.errored:
+                return SessionState.ERRORED
+
+            if handles.select_handle is not None and not handleprops.iswindow(handles.select_handle):
+                handles.select_handle = None
+            if handles.select_handle is None:
+                handles.select_handle = next((win.handle for win in handles.app.windows()
+                                              if self.select_title in win.window_text()), None)
+            if handles.select_handle is None:
+                return SessionState.RUNNING
+
+            select_win = handles.app.window(handle=handles.select_handle)
+            if select_win.child_window(**self.error_criteria).exists(timeout=0):
+                handles.errored = True
+                return SessionState.ERRORED
+            return SessionState.READY
+        except (ProcessNotFoundError, InvalidWindowHandle):
+            self.forget(pid=pid)
+            return SessionState.GONE
+
+
+class WindowsDesktop:
+    def __init__(self, credentials: Credentials, process: Process, timer: Timer = None,
+                 registry: ProcessRegistry = None, error_class_name: str = None, error_depth: int = None) -> None:
+        if Colvir is None:
+            raise RuntimeError('pywinauto and pywin32 are required to drive Colvir')
+        self.credentials: Credentials = credentials
+        self.process: Process = process
+        self.timer: Timer = timer if timer else Timer()
+        self.registry: ProcessRegistry = registry if registry else default_registry
+        self.sessions: SessionStateCache = SessionStateCache(registry=self.registry, error_class_name=error_class_name,
+                                                             error_depth=error_depth)
+        self.breaker: CircuitBreaker = CircuitBreaker()
+        self.waiter: Waiter = Waiter()
+        self.excel = None
+        self.converter_backend: str = 'com'
+        self.converter_kwargs: Dict = {}
+
+    def get_excel(self):
+        if self.excel is None:
+            self.excel = win32.gencache.EnsureDispatch('Excel.Application')
+            self.excel.DisplayAlerts = False
+        return self.excel
+
+    def kill_all(self, names: List[str]) -> List[int]:
+        denied: List[int] = self.registry.kill_names(names=names)
+        return [pid for pid in denied if 'EXCEL' not in self.registry.table.get(pid, '')]
+
+    def kill(self, pid: int) -> None:
+        self.sessions.forget(pid=pid)
+        self.registry.terminate(pids=[pid], timeout=1.)
+
+    def open_session(self, branch_info: BranchInfo, pids: List[int], restricted_pids: List[int]) -> int or None:
+        colvir: Colvir = Colvir(
+            pids=pids,
+            restricted_pids=restricted_pids,
+            credentials=self.credentials,
+            process=self.process,
+            data=branch_info,
+            breaker=self.breaker,
+            waiter=self.waiter,
+            timer=self.timer,
+            registry=self.registry
+        )
+        if not colvir.open():
+            return None
+        return colvir.pid
+
+    def get_session_state(self, pid: int) -> str:
+        return self.sessions.get_state(pid=pid)
+
+    def is_paused(self) -> bool:
+        return self.breaker.is_open()
+
+    def validate_export(self, full_path: str) -> bool:
+        try:
+            return XlsReader(file_path=full_path).has_styled_cells(max_row=50)
+        except ValueError as e:
+            print(f'could not read {full_path} natively, validating through Excel: {e}')
+        return self.validate_export_excel(full_path=full_path)
+
+    def validate_export_excel(self, full_path: str) -> bool:
+        shutil.copyfile(src=full_path, dst=f'{full_path}_copy.xls')
+        xls_file_path = f'{full_path}_copy.xls'
+        xlsx_file_path = xls_file_path + 'x'
+
+        if not os.path.exists(path=xlsx_file_path):
+            wb = self.get_excel().Workbooks.Open(xls_file_path)
+            wb.SaveAs(xlsx_file_path, FileFormat=51)
+            wb.Close()
+
+        workbook: Workbook = openpyxl.load_workbook(xlsx_file_path, data_only=True)
+        sheet: Worksheet = workbook.active
+        os.unlink(xlsx_file_path)
+        os.unlink(xls_file_path)
+
+        return next((True for row in sheet.iter_rows(max_row=50) for cell in row if cell.has_style), False)
+
+    def report(self) -> str:
+        return self.waiter.report()
+
+    def close(self) -> None:
+        if self.excel is not None:
+            self.excel.Quit()
+            self.excel = None
+        self.registry.shutdown()
@@ -0,0 +1,66 @@
+import json
+import os
+from typing import Dict, List, Tuple
+from data_structures import BranchInfo, get_osv_path
+
+
+class DurationHistory:
+    action_order: List[str] = ['Z_160_GL_003', 'Z_160_GL_020', 'S_CLI_003', 'S_CLI_004', 'S_CLI_013', 'S_CLI_014']
+
+    def __init__(self, path: str = get_osv_path(name='durations.json'), alpha: float = .3,
+                 save_every: int = 20) -> None:
+        self.path: str = path
+        self.alpha: float = alpha
+        self.save_every: int = save_every
+        self.unsaved: int = 0
+        self.history: Dict[str, List[float]] = self.load()
+
+    def load(self) -> Dict[str, List[float]]:
+        try:
+            with open(file=self.path, mode='r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        tmp_path: str = f'{self.path}.tmp'
+        try:
+            with open(file=tmp_path, mode='w', encoding='utf-8') as f:
+                json.dump(self.history, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.unsaved = 0
+        except OSError as e:
+            print(f'could not save durations to {self.path}: {e}')
+
+    @staticmethod
+    def get_keys(branch_info: BranchInfo) -> List[str]:
+        action, branch, account, date_diff = branch_info.action, branch_info.branch, branch_info.account, branch_info.date_diff
+        return [
+            f'{action}|{branch}|{account}|{date_diff}',
+            f'{action}|{branch}|*|{date_diff}',
+            f'{action}|*|*|{date_diff}',
+            f'{action}|*|*|*',
+        ]
+
+    def record(self, branch_info: BranchInfo, seconds: float) -> None:
+        for key in self.get_keys(branch_info=branch_info):
+            average, count = self.history.get(key, (seconds, 0))
+            self.history[key] = [average + self.alpha * (seconds - average) if count else seconds, count + 1]
+        self.unsaved += 1
+        if self.unsaved >= self.save_every:
+            self.save()
+
+    def estimate(self, branch_info: BranchInfo) -> float or None:
+        for key in self.get_keys(branch_info=branch_info):
+            if key in self.history:
+                return self.history[key][0]
+        return None
+
+    def get_order_key(self, branch_info: BranchInfo) -> Tuple[int, float]:
+        estimate: float or None = self.estimate(branch_info=branch_info)
+        if estimate is not None:
+            return 0, -estimate
+        return 1, self.action_order.index(branch_info.action)
+
+    def order(self, data: List[BranchInfo]) -> List[BranchInfo]:
+        return sorted(data, key=self.get_order_key)
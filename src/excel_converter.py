@@ -1,6 +1,19 @@
+import itertools
+import multiprocessing
 import os
-from typing import Dict
-import win32com.client as win32
+import queue
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Tuple
+import psutil
+
+try:
+    import win32com.client as win32
+    import win32process
+except ImportError:
+    win32 = win32process = None
 
 
 class ExcelConverter:
@@ -9,6 +22,19 @@ class ExcelConverter:
             'xlsb': 50,
             'xlsx': 51
         }
+        self.excel = None
+
+    def get_excel(self):
+        if self.excel is None:
+            self.excel = win32.gencache.EnsureDispatch('Excel.Application')
+            self.excel.Visible = False
+            self.excel.DisplayAlerts = False
+        return self.excel
+
+    def get_excel_pid(self) -> int or None:
+        if self.excel is None:
+            return None
+        return win32process.GetWindowThreadProcessId(self.excel.Hwnd)[1]
 
     def convert(self, src_file: str, dst_file: str, file_type: str) -> None:
         if not os.path.isfile(path=src_file):
@@ -16,17 +42,268 @@ class ExcelConverter:
 
         file_format: int = self.file_formats[file_type]
 
-        excel = win32.gencache.EnsureDispatch('Excel.Application')
-        excel.Visible = False
-        success: bool = False
+        workbook = self.get_excel().Workbooks.Open(src_file)
+        try:
+            workbook.SaveAs(dst_file, FileFormat=file_format)
+        finally:
+            workbook.Close(False)
+
+    def quit(self) -> None:
+        if self.excel is None:
+            return
         try:
-            with excel.Workbooks.Open(src_file) as worbook:
-                worbook.SaveAs(dst_file, FileFormat=file_format)
-                success = True
-        except Exception as e:
-            print(f'Error Occured: {e}')
+            self.excel.Quit()
         finally:
-            if success:
-                excel.Application.Quit()
-            else:
-                excel.Quit()
+            self.excel = None
+
+
+@dataclass
+class ConversionJob:
+    job_id: int
+    src_file: str
+    dst_file: str
+    file_type: str = 'xlsb'
+    remove_src: bool = False
+    attempts: int = 0
+
+
+@dataclass
+class ConversionResult:
+    job: ConversionJob
+    tag: Any
+    success: bool
+    error: str or None = None
+    duration: float = 0.
+
+
+class ComBackend:
+    def __init__(self) -> None:
+        self.converter: ExcelConverter = ExcelConverter()
+        self.converter.get_excel()
+
+    @property
+    def helper_pid(self) -> int or None:
+        return self.converter.get_excel_pid()
+
+    def convert(self, job: ConversionJob) -> None:
+        self.converter.convert(src_file=job.src_file, dst_file=job.dst_file, file_type=job.file_type)
+
+    def close(self) -> None:
+        self.converter.quit()
+
+
+class CopyBackend:
+    def __init__(self, delay: float = 0.) -> None:
+        self.delay: float = delay
+        self.helper_pid: int or None = None
+
+    def convert(self, job: ConversionJob) -> None:
+        if not os.path.isfile(path=job.src_file):
+            raise ValueError(f'{job.src_file} does not exist.')
+        time.sleep(self.delay)
+        shutil.copyfile(src=job.src_file, dst=job.dst_file)
+
+    def close(self) -> None:
+        pass
+
+
+BACKENDS: Dict = {
+    'com': ComBackend,
+    'copy': CopyBackend,
+}
+
+
+def run_worker(backend_name: str, backend_kwargs: Dict, jobs, results) -> None:
+    backend = BACKENDS[backend_name](**backend_kwargs)
+    try:
+        while True:
+            job: ConversionJob or None = jobs.get()
+            if job is None:
+                break
+            results.put(('started', job.job_id, os.getpid(), backend.helper_pid))
+            start: float = time.monotonic()
+            error: str or None = None
+            try:
+                backend.convert(job=job)
+                if job.remove_src:
+                    os.unlink(job.src_file)
+            except Exception as e:
+                error = f'{type(e).__name__}: {e}'
+            results.put(('finished', job.job_id, time.monotonic() - start, error))
+    finally:
+        backend.close()
+
+
+class ConverterService:
+    def __init__(self, backend: str = 'com', backend_kwargs: Dict = None, workers: int = 2,
+                 timeout: float = 300., retries: int = 2) -> None:
+        self.backend_name: str = backend
+        self.backend_kwargs: Dict = backend_kwargs if backend_kwargs else {}
+        self.workers_number: int = workers
+        self.timeout: float = timeout
+        self.retries: int = retries
+
+        self.context = multiprocessing.get_context('spawn')
+        self.jobs = None
+        self.messages = None
+        self.workers: Dict[int, Any] = {}
+        self.helpers: Dict[int, int] = {}
+
+        self.job_ids = itertools.count(1)
+        self.pending: Dict[int, Tuple[ConversionJob, Any]] = {}
+        self.running: Dict[int, Tuple[int, float]] = {}
+        self.results: queue.Queue = queue.Queue()
+        self.lock: threading.Lock = threading.Lock()
+        self.idle: threading.Condition = threading.Condition(self.lock)
+        self.stopped: threading.Event = threading.Event()
+        self.closing: bool = False
+        self.supervisor: threading.Thread or None = None
+
+        self.counters: Dict[str, int] = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'retried': 0, 'timed_out': 0, 'restarted_workers': 0}
+        self.durations: List[float] = []
+
+    def __enter__(self) -> 'ConverterService':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def start(self) -> None:
+        if self.supervisor:
+            return
+        self.jobs = self.context.Queue()
+        self.messages = self.context.Queue()
+        for _ in range(self.workers_number):
+            self.spawn_worker()
+        self.supervisor = threading.Thread(target=self.supervise, name='converter-supervisor', daemon=True)
+        self.supervisor.start()
+
+    def spawn_worker(self) -> None:
+        worker = self.context.Process(
+            target=run_worker,
+            args=(self.backend_name, self.backend_kwargs, self.jobs, self.messages),
+            daemon=True
+        )
+        worker.start()
+        self.workers[worker.pid] = worker
+
+    def submit(self, src_file: str, dst_file: str, file_type: str = 'xlsb', remove_src: bool = False, tag: Any = None) -> int:
+        self.start()
+        job: ConversionJob = ConversionJob(job_id=next(self.job_ids), src_file=src_file, dst_file=dst_file,
+                                           file_type=file_type, remove_src=remove_src)
+        with self.lock:
+            self.pending[job.job_id] = (job, tag)
+            self.counters['submitted'] += 1
+        self.jobs.put(job)
+        return job.job_id
+
+    def drain(self) -> List[ConversionResult]:
+        results: List[ConversionResult] = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def join(self, timeout: float = None) -> bool:
+        with self.idle:
+            return self.idle.wait_for(lambda: not self.pending, timeout=timeout)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            metrics: Dict[str, Any] = dict(self.counters)
+            metrics['queued'] = len(self.pending) - len(self.running)
+            metrics['in_flight'] = len(self.running)
+            metrics['workers'] = len(self.workers)
+            durations: List[float] = sorted(self.durations)
+        metrics['avg_duration'] = sum(durations) / len(durations) if durations else 0.
+        metrics['max_duration'] = durations[-1] if durations else 0.
+        return metrics
+
+    def close(self) -> None:
+        if not self.supervisor:
+            return
+        self.join(timeout=self.timeout)
+        with self.lock:
+            self.closing = True
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in list(self.workers.values()):
+            worker.join(timeout=30)
+            if worker.is_alive():
+                worker.terminate()
+        self.stopped.set()
+        self.supervisor.join()
+        self.supervisor = None
+        self.workers.clear()
+        self.stopped.clear()
+        self.closing = False
+
+    def supervise(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                message: Tuple = self.messages.get(timeout=.5)
+                self.handle_message(message=message)
+            except queue.Empty:
+                pass
+            self.check_workers()
+
+    def handle_message(self, message: Tuple) -> None:
+        kind, job_id, value, extra = message
+        with self.lock:
+            if kind == 'started':
+                self.running[job_id] = (value, time.monotonic() + self.timeout)
+                if extra:
+                    self.helpers[value] = extra
+            elif kind == 'finished' and self.running.pop(job_id, None):
+                self.finish(job_id=job_id, duration=value, error=extra)
+
+    def check_workers(self) -> None:
+        now: float = time.monotonic()
+        with self.lock:
+            for job_id, (worker_pid, deadline) in list(self.running.items()):
+                worker = self.workers.get(worker_pid)
+                if deadline > now and worker is not None and worker.is_alive():
+                    continue
+                del self.running[job_id]
+                timed_out: bool = deadline <= now
+                if timed_out:
+                    self.counters['timed_out'] += 1
+                self.restart_worker(worker_pid=worker_pid)
+                self.finish(job_id=job_id, duration=self.timeout if timed_out else 0.,
+                            error='TimeoutError: conversion timed out' if timed_out else 'worker died')
+            for worker_pid, worker in list(self.workers.items()):
+                if not worker.is_alive() and not self.closing:
+                    self.restart_worker(worker_pid=worker_pid)
+
+    def restart_worker(self, worker_pid: int) -> None:
+        worker = self.workers.pop(worker_pid, None)
+        for pid in (self.helpers.pop(worker_pid, None), worker_pid):
+            if not pid:
+                continue
+            try:
+                psutil.Process(pid).kill()
+            except psutil.Error:
+                pass
+        if worker is not None:
+            worker.join(timeout=5)
+        self.counters['restarted_workers'] += 1
+        self.spawn_worker()
+
+    def finish(self, job_id: int, duration: float, error: str or None) -> None:
+        if job_id not in self.pending:
+            return
+        job, tag = self.pending[job_id]
+        job.attempts += 1
+        if error and job.attempts <= self.retries:
+            self.counters['retried'] += 1
+            print(f'retrying conversion of {job.src_file} ({job.attempts}/{self.retries}): {error}')
+            self.jobs.put(job)
+            return
+
+        del self.pending[job_id]
+        self.durations.append(duration)
+        self.counters['failed' if error else 'succeeded'] += 1
+        self.results.put(ConversionResult(job=job, tag=tag, success=not error, error=error, duration=duration))
+        self.idle.notify_all()
@@ -0,0 +1,146 @@
+import os
+import time
+from time import sleep
+from typing import Dict, List, Set, Tuple
+from data_structures import FilesInfo
+
+try:
+    import win32con
+    import win32event
+    import win32file
+except ImportError:
+    win32con = win32event = win32file = None
+
+
+class ExportScanner:
+    mtime_resolution_ns: int = 2 * 10 ** 9
+
+    def __init__(self, root: str, use_notifications: bool = True) -> None:
+        self.root: str = root
+
+        self.dir_mtimes: Dict[str, int or None] = {}
+        self.dir_children: Dict[str, List[str]] = {}
+        self.files: Dict[str, Tuple[int, int]] = {}
+        self.deferred: Dict[str, FilesInfo] = {}
+        self.done: Set[str] = set()
+        self.rejected: Set[str] = set()
+
+        self.primed: bool = False
+        self.change_handle = None
+        if use_notifications and win32file is not None:
+            try:
+                self.change_handle = win32file.FindFirstChangeNotification(
+                    self.root, True,
+                    win32con.FILE_NOTIFY_CHANGE_FILE_NAME | win32con.FILE_NOTIFY_CHANGE_DIR_NAME
+                    | win32con.FILE_NOTIFY_CHANGE_SIZE | win32con.FILE_NOTIFY_CHANGE_LAST_WRITE
+                )
+            except Exception as e:
+                print(f'change notifications are not available for {self.root}, polling instead: {e}')
+
+    @staticmethod
+    def is_export_name(name: str) -> bool:
+        if 'xlsx' in name or name.endswith('_copy.xls'):
+            return False
+        return name[:name.find('_')].isdigit()
+
+    def poll(self) -> List[FilesInfo]:
+        changed: Dict[str, FilesInfo] = self.deferred
+        self.deferred = {}
+
+        if self.primed and not self._has_notification():
+            return list(changed.values())
+        self.primed = True
+
+        self._scan_dir(path=self.root, changed=changed)
+        for full_path, signature in list(self.files.items()):
+            if full_path in changed:
+                continue
+            try:
+                stat: os.stat_result = os.stat(full_path)
+            except FileNotFoundError:
+                del self.files[full_path]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) == signature:
+                continue
+            self.files[full_path] = (stat.st_size, stat.st_mtime_ns)
+            changed[full_path] = FilesInfo(path=os.path.dirname(full_path), name=os.path.basename(full_path))
+
+        return list(changed.values())
+
+    def wait(self, timeout: float, deferred_interval: float = 1.) -> None:
+        if self.deferred:
+            timeout = min(timeout, deferred_interval)
+        if self.change_handle is None:
+            sleep(timeout)
+            return
+        win32event.WaitForSingleObject(self.change_handle, int(timeout * 1000))
+
+    def defer(self, file_info: FilesInfo) -> None:
+        if file_info.full_path in self.done or file_info.full_path in self.rejected:
+            return
+        self.deferred[file_info.full_path] = file_info
+
+    def mark_done(self, file_info: FilesInfo) -> None:
+        self.done.add(file_info.full_path)
+        self._forget(full_path=file_info.full_path)
+
+    def mark_rejected(self, file_info: FilesInfo) -> None:
+        self.rejected.add(file_info.full_path)
+        self._forget(full_path=file_info.full_path)
+
+    def close(self) -> None:
+        if self.change_handle is not None:
+            win32file.FindCloseChangeNotification(self.change_handle)
+            self.change_handle = None
+
+    def _forget(self, full_path: str) -> None:
+        self.files.pop(full_path, None)
+        self.deferred.pop(full_path, None)
+
+    def _has_notification(self) -> bool:
+        if self.change_handle is None:
+            return True
+        if win32event.WaitForSingleObject(self.change_handle, 0) != win32event.WAIT_OBJECT_0:
+            return False
+        win32file.FindNextChangeNotification(self.change_handle)
+        return True
+
+    def _scan_dir(self, path: str, changed: Dict[str, FilesInfo]) -> None:
+        try:
+            mtime: int = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self.dir_mtimes.pop(path, None)
+            self.dir_children.pop(path, None)
+            return
+
+        if self.dir_mtimes.get(path) != mtime:
+            subdirs: List[str] = []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        subdirs.append(entry.path)
+                        continue
+                    self._check_file(path=path, name=entry.name, stat=entry.stat(), changed=changed)
+            self.dir_children[path] = subdirs
+            self.dir_mtimes[path] = mtime if self._is_settled(path=path, mtime=mtime) else None
+
+        for subdir in self.dir_children.get(path, []):
+            self._scan_dir(path=subdir, changed=changed)
+
+    def _is_settled(self, path: str, mtime: int) -> bool:
+        try:
+            if os.stat(path).st_mtime_ns != mtime:
+                return False
+        except FileNotFoundError:
+            return False
+        return time.time_ns() - mtime >= self.mtime_resolution_ns
+
+    def _check_file(self, path: str, name: str, stat: os.stat_result, changed: Dict[str, FilesInfo]) -> None:
+        full_path: str = os.path.join(path, name)
+        if full_path in self.done or full_path in self.rejected or not self.is_export_name(name=name):
+            return
+        signature: Tuple[int, int] = (stat.st_size, stat.st_mtime_ns)
+        if self.files.get(full_path) == signature:
+            return
+        self.files[full_path] = signature
+        changed[full_path] = FilesInfo(path=path, name=name)
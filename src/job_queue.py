@@ -0,0 +1,148 @@
+import json
+import platform
+import sqlite3
+import time
+from typing import Dict, Iterator, List, Set, Tuple
+from data_structures import BranchInfo
+
+
+class JobState:
+    PENDING = 'pending'
+    LEASED = 'leased'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class JobQueue:
+    def __init__(self, db_path: str, node: str = None, lease_seconds: float = 15 * 60, timeout: float = 60) -> None:
+        self.db_path: str = db_path
+        self.node: str = node if node else platform.node()
+        self.lease_seconds: float = lease_seconds
+        self.timeout: float = timeout
+        self.connection: sqlite3.Connection = self.connect()
+        self.beat_at: float or None = None
+        self.leased: Set[str] = set()
+
+        with self.transaction() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'job_id TEXT PRIMARY KEY, '
+                'position INTEGER NOT NULL, '
+                'payload TEXT NOT NULL, '
+                'state TEXT NOT NULL, '
+                'owner TEXT, '
+                'lease_expires REAL, '
+                'attempts INTEGER NOT NULL DEFAULT 0, '
+                'updated_at REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, position)')
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+
+    def transaction(self, connection: sqlite3.Connection = None) -> 'Transaction':
+        return Transaction(connection=connection if connection else self.connection)
+
+    def __enter__(self) -> 'JobQueue':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def enqueue(self, data: List[BranchInfo]) -> int:
+        now: float = time.time()
+        with self.transaction() as connection:
+            position: int = connection.execute('SELECT COALESCE(MAX(position), 0) FROM jobs').fetchone()[0]
+            before: int = connection.total_changes
+            connection.executemany(
+                'INSERT OR IGNORE INTO jobs (job_id, position, payload, state, updated_at) VALUES (?, ?, ?, ?, ?)',
+                ((b.job_id, position + i, json.dumps(b.to_payload(), ensure_ascii=False), JobState.PENDING, now)
+                 for i, b in enumerate(data, start=1))
+            )
+            return connection.total_changes - before
+
+    def lease(self, limit: int = 1) -> List[BranchInfo]:
+        now: float = time.time()
+        with self.transaction() as connection:
+            rows: List[Tuple[str, str, str]] = connection.execute(
+                'SELECT job_id, payload, owner FROM jobs '
+                'WHERE state = ? OR (state = ? AND lease_expires < ?) '
+                'ORDER BY position LIMIT ?',
+                (JobState.PENDING, JobState.LEASED, now, limit)
+            ).fetchall()
+            connection.executemany(
+                'UPDATE jobs SET state = ?, owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE job_id = ?',
+                ((JobState.LEASED, self.node, now + self.lease_seconds, now, job_id) for job_id, _, _ in rows)
+            )
+        self.leased.update(job_id for job_id, _, _ in rows)
+        for job_id, _, owner in rows:
+            if owner and owner != self.node:
+                print(f'{self.node} took over expired lease {job_id} from {owner}')
+        return [BranchInfo(**json.loads(payload)) for _, payload, _ in rows]
+
+    def iter_leases(self) -> Iterator[BranchInfo]:
+        while True:
+            leased: List[BranchInfo] = self.lease(limit=1)
+            if not leased:
+                return
+            yield leased[0]
+
+    def heartbeat(self) -> int:
+        now: float = time.time()
+        job_ids: List[str] = sorted(self.leased)
+        renewed: int = 0
+        with self.transaction() as connection:
+            for i in range(0, len(job_ids), 500):
+                chunk: List[str] = job_ids[i:i + 500]
+                renewed += connection.execute(
+                    f'UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE owner = ? AND state = ? '
+                    f'AND job_id IN ({", ".join("?" * len(chunk))})',
+                    (now + self.lease_seconds, now, self.node, JobState.LEASED, *chunk)
+                ).rowcount
+        return renewed
+
+    def beat(self) -> None:
+        now: float = time.monotonic()
+        if self.beat_at is not None and now - self.beat_at < self.lease_seconds / 3:
+            return
+        self.beat_at = now
+        try:
+            self.heartbeat()
+        except sqlite3.Error as e:
+            print(f'heartbeat of {self.node} failed: {e}')
+
+    def complete(self, job_id: str) -> None:
+        self._finish(job_id=job_id, state=JobState.DONE)
+
+    def fail(self, job_id: str) -> None:
+        self._finish(job_id=job_id, state=JobState.FAILED)
+
+    def _finish(self, job_id: str, state: str) -> None:
+        self.leased.discard(job_id)
+        with self.transaction() as connection:
+            connection.execute(
+                'UPDATE jobs SET state = ?, lease_expires = NULL, updated_at = ? WHERE job_id = ? AND owner = ?',
+                (state, time.time(), job_id, self.node)
+            )
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.connection.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+
+    def is_drained(self) -> bool:
+        counts: Dict[str, int] = self.counts()
+        return not counts.get(JobState.PENDING) and not counts.get(JobState.LEASED)
+
+
+class Transaction:
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection: sqlite3.Connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
@@ -0,0 +1,75 @@
+import json
+import os
+import time
+from typing import Dict, List, TextIO
+from data_structures import BranchInfo, get_period_path
+
+
+class JobStage:
+    PLANNED = 'planned'
+    SESSION_OPENED = 'session_opened'
+    EXPORTED = 'exported'
+    VALIDATED = 'validated'
+    CONVERTED = 'converted'
+    DELIVERED = 'delivered'
+    REJECTED = 'rejected'
+
+
+class RunJournal:
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.states: Dict[str, Dict] = self.load()
+        self.file: TextIO = open(file=self.path, mode='a', encoding='utf-8')
+        if not self.ends_with_newline():
+            self.file.write('\n')
+            self.file.flush()
+
+    def ends_with_newline(self) -> bool:
+        with open(file=self.path, mode='rb') as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    @staticmethod
+    def get_default_path(data: List[BranchInfo]) -> str:
+        return get_period_path(prefix='journal', data=data)
+
+    def __enter__(self) -> 'RunJournal':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def load(self) -> Dict[str, Dict]:
+        states: Dict[str, Dict] = {}
+        if not os.path.exists(self.path):
+            return states
+        with open(file=self.path, mode='r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record: Dict = json.loads(line)
+                except ValueError:
+                    continue
+                states[record['job_id']] = {**states.get(record['job_id'], {}), **record}
+        return states
+
+    def record(self, branch_info: BranchInfo, stage: str, **details) -> None:
+        record: Dict = {'job_id': branch_info.job_id, 'stage': stage, 'ts': time.time(), **details}
+        self.states[record['job_id']] = {**self.states.get(record['job_id'], {}), **record}
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def plan(self, data: List[BranchInfo]) -> None:
+        for branch_info in data:
+            if branch_info.job_id not in self.states:
+                self.record(branch_info=branch_info, stage=JobStage.PLANNED)
+
+    def get_stage(self, branch_info: BranchInfo) -> str or None:
+        return self.states.get(branch_info.job_id, {}).get('stage')
+
+    def get_details(self, branch_info: BranchInfo) -> Dict:
+        return self.states.get(branch_info.job_id, {})
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import time
+from typing import Tuple
+from data_structures import get_osv_path
+
+
+class CompletionLedger:
+    def __init__(self, db_path: str = get_osv_path(name='completed_reports.sqlite')) -> None:
+        self.db_path: str = db_path
+        self.connection: sqlite3.Connection = sqlite3.connect(db_path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS reports ('
+                'path TEXT PRIMARY KEY, '
+                'size INTEGER NOT NULL, '
+                'mtime_ns INTEGER NOT NULL, '
+                'row_count INTEGER, '
+                'recorded_at REAL NOT NULL)'
+            )
+
+    def __enter__(self) -> 'CompletionLedger':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @staticmethod
+    def get_key(path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    def record(self, path: str, row_count: int or None = None) -> None:
+        stat: os.stat_result = os.stat(path)
+        self._write(path=path, stat=stat, row_count=row_count)
+
+    def set_row_count(self, path: str, row_count: int) -> None:
+        with self.connection:
+            self.connection.execute('UPDATE reports SET row_count = ? WHERE path = ?', (row_count, self.get_key(path=path)))
+
+    def forget(self, path: str) -> None:
+        with self.connection:
+            self.connection.execute('DELETE FROM reports WHERE path = ?', (self.get_key(path=path),))
+
+    def lookup(self, path: str) -> Tuple[int, int or None] or None:
+        row: Tuple or None = self.connection.execute(
+            'SELECT size, mtime_ns, row_count FROM reports WHERE path = ?', (self.get_key(path=path),)
+        ).fetchone()
+        try:
+            stat: os.stat_result = os.stat(path)
+        except OSError:
+            if row:
+                self.forget(path=path)
+            return None
+
+        if row and (row[0], row[1]) == (stat.st_size, stat.st_mtime_ns):
+            return row[0], row[2]
+        self._write(path=path, stat=stat, row_count=None)
+        return stat.st_size, None
+
+    def _write(self, path: str, stat: os.stat_result, row_count: int or None) -> None:
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO reports (path, size, mtime_ns, row_count, recorded_at) VALUES (?, ?, ?, ?, ?)',
+                (self.get_key(path=path), stat.st_size, stat.st_mtime_ns, row_count, time.time())
+            )
@@ -1,54 +1,49 @@
 import datetime
 import os
-import platform
 import warnings
 from dataclasses import fields
-from typing import List
+from typing import List, Tuple, Dict
 import dotenv
-import pandas
-import psutil
 import requests
-from pandas.core.frame import DataFrame
 from bot_notification import TelegramNotifier
+from concurrency import ConcurrencyController
 from data_extractor import DataGetter
 from data_structures import Credentials, Process, BranchInfo
+from durations import DurationHistory
+from job_queue import JobQueue
+from journal import RunJournal
+from ledger import CompletionLedger
+from process_registry import registry
 from robot import Robot
 from utils import RobotStatusManager
+from xlsb_probe import XlsbProbe
 
 
-def get_left_data(data: List[BranchInfo]) -> List[BranchInfo]:
-    final_full_paths: List[str] = [os.path.join(x.final_save_path, x.final_name) for x in data]
-    finished_full_paths: List[str] = []
-
-    counter: int = 0
-    for path, subdirs, names in os.walk(rf'C:\finished_reports'):
-        for name in names:
-            full_path: str = os.path.join(path, name)
-            finished_full_paths.append(full_path)
-            for i, compare_path in enumerate(final_full_paths):
-                if full_path == compare_path:
-                    continue
-            else:
-                counter += 1
+def get_left_data(data: List[BranchInfo], ledger: CompletionLedger) -> List[BranchInfo]:
     left_branch_infos: List[BranchInfo] = []
-    for i, compare_path in enumerate(final_full_paths):
-        if compare_path in finished_full_paths:
+    unknown_rows: Dict[str, List[Tuple[BranchInfo, int]]] = {}
+    for branch_info in data:
+        full_path: str = os.path.join(branch_info.final_save_path, branch_info.final_name)
+        entry: Tuple[int, int or None] or None = ledger.lookup(path=full_path)
+        if entry is None:
+            left_branch_infos.append(branch_info)
             continue
-        counter += 1
-        left_branch_infos.append(data[i])
 
-    for branch_info in finished_full_paths:
-        file_size = round(os.path.getsize(branch_info) / 1024, 2)
-        if file_size > 20:
+        size, row_count = entry
+        if not XlsbProbe.is_small(size=size):
             continue
-        dataframe: DataFrame = pandas.read_excel(branch_info, engine='pyxlsb')
-        if len(dataframe) != 20:
+        if row_count is None:
+            unknown_rows.setdefault(full_path, []).append((branch_info, size))
             continue
-        for i, compare_path in enumerate(final_full_paths):
-            if compare_path != branch_info:
-                continue
-            counter += 1
-            left_branch_infos.append(data[i])
+        if XlsbProbe.is_placeholder(size=size, row_count=row_count):
+            left_branch_infos.append(branch_info)
+
+    row_counts: Dict[str, int] = XlsbProbe.count_many(file_paths=unknown_rows, limit=XlsbProbe.placeholder_rows + 1)
+    for full_path, row_count in row_counts.items():
+        ledger.set_row_count(path=full_path, row_count=row_count)
+        for branch_info, size in unknown_rows[full_path]:
+            if XlsbProbe.is_placeholder(size=size, row_count=row_count):
+                left_branch_infos.append(branch_info)
 
     return left_branch_infos
 
@@ -60,14 +55,7 @@ def print_table(data: List[BranchInfo]) -> None:
 
 
 def kill_colvirs() -> None:
-    for proc in psutil.process_iter():
-        if not any(process_name in proc.name() for process_name in ['COLVIR', 'EXCEL']):
-            continue
-        try:
-            p: psutil.Process = psutil.Process(proc.pid)
-            p.terminate()
-        except psutil.AccessDenied:
-            continue
+    registry.kill_names(names=['COLVIR', 'EXCEL'])
 
 
 def main() -> None:
@@ -75,43 +63,46 @@ def main() -> None:
     dotenv.load_dotenv()
 
     colvir_usr, colvir_psw = os.getenv(f'COLVIR_USR'), os.getenv(f'COLVIR_PSW')
+    job_queue_path = os.getenv('JOB_QUEUE_PATH')
     process_name, process_path = 'COLVIR', os.getenv('COLVIR_PROCESS_PATH')
+    min_sessions, max_sessions = int(os.getenv('MIN_SESSIONS', 4)), int(os.getenv('MAX_SESSIONS', 40))
 
     data_getter = DataGetter(_date=datetime.datetime(2023, 3, 1))
     data: List[BranchInfo] = data_getter.info
 
-    data.sort(key=lambda x: ['Z_160_GL_003', 'Z_160_GL_020', 'S_CLI_003', 'S_CLI_004', 'S_CLI_013', 'S_CLI_014'].index(x.action))
-    # data = [b for i, b in enumerate(data) if i % 2 == (0 if platform.node() == 'robot-7' else 1)]
+    history: DurationHistory = DurationHistory()
+    data = history.order(data)
 
     # print_table(data)
 
-    with requests.Session() as session:
+    with requests.Session() as session, TelegramNotifier(chat_id=os.getenv(f'CHAT_ID'), session=session) as notifier:
         args = {
             'credentials': Credentials(usr=colvir_usr, psw=colvir_psw),
             'process': Process(name=process_name, path=process_path),
-            'notifier': TelegramNotifier(chat_id=os.getenv(f'CHAT_ID'), session=session),
-            'data': data
+            'notifier': notifier,
+            'data': data,
+            'history': history,
+            'controller': ConcurrencyController(min_concurrency=min_sessions, max_concurrency=max_sessions)
         }
 
         # robot: Robot = Robot(**args)
         # robot.run()
 
-        full_path_data = [os.path.join(b.final_save_path, b.final_name) for b in data]
-
-        finished_files = []
-        for path, subdirs, names in os.walk(
-                r'\\dbu-upload\c$\Users\bolatova.g\Desktop\робот февраль 2023'):
-            for name in names:
-                full_path = os.path.join(path, name)
-                finished_files.append(full_path)
+        with CompletionLedger() as ledger:
+            _data = [b for b in data if ledger.lookup(path=os.path.join(b.final_save_path, b.final_name)) is None]
 
-        _data = [data[i] for i, path in enumerate(full_path_data) if path not in finished_files]
+            args['data'] = _data
+            args['ledger'] = ledger
+            args['journal'] = RunJournal(path=RunJournal.get_default_path(data=data))
+            args['journal'].plan(data=_data)
 
-        args['data'] = _data
+            if job_queue_path:
+                args['job_queue'] = JobQueue(db_path=job_queue_path)
+                print(f'{args["job_queue"].enqueue(data=_data)} jobs added to {job_queue_path}')
 
-        if _data:
-            robot = Robot(**args)
-            robot.run()
+            if _data:
+                robot = Robot(**args)
+                robot.run()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import Dict, List, Set
+import psutil
+
+
+class ProcessRegistry:
+    def __init__(self, tick: float = 1.) -> None:
+        self.tick: float = tick
+        self.tracked: Dict[int, psutil.Process] = {}
+        self.children: Dict[int, Set[int]] = {}
+        self.table: Dict[int, str] = {}
+        self.refreshed_at: float or None = None
+        self.lock: threading.RLock = threading.RLock()
+
+    def refresh(self, force: bool = False) -> Dict[int, str]:
+        with self.lock:
+            now: float = time.monotonic()
+            if force or self.refreshed_at is None or now - self.refreshed_at >= self.tick:
+                self.table = {proc.pid: proc.info['name'] or '' for proc in psutil.process_iter(['name'])}
+                self.refreshed_at = now
+            return self.table
+
+    def find(self, name: str, exclude: Set[int] = None) -> List[int]:
+        exclude = exclude if exclude else set()
+        return [pid for pid, proc_name in self.refresh().items() if name in proc_name and pid not in exclude]
+
+    def track(self, pid: int) -> psutil.Process or None:
+        with self.lock:
+            if pid in self.tracked:
+                return self.tracked[pid]
+            try:
+                self.tracked[pid] = psutil.Process(pid)
+            except psutil.NoSuchProcess:
+                return None
+            return self.tracked[pid]
+
+    def track_children(self, pid: int) -> List[int]:
+        process: psutil.Process or None = self.track(pid=pid)
+        if process is None:
+            return []
+        try:
+            children: List[psutil.Process] = process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return []
+        with self.lock:
+            for child in children:
+                self.tracked.setdefault(child.pid, child)
+                self.children.setdefault(pid, set()).add(child.pid)
+        return [child.pid for child in children]
+
+    def get_name(self, pid: int) -> str or None:
+        process: psutil.Process or None = self.tracked.get(pid)
+        if process is not None:
+            try:
+                return process.name()
+            except psutil.Error:
+                return None
+        return self.refresh().get(pid)
+
+    def untrack(self, pid: int) -> None:
+        with self.lock:
+            self.tracked.pop(pid, None)
+            for child in self.children.pop(pid, set()):
+                self.tracked.pop(child, None)
+
+    def is_alive(self, pid: int) -> bool:
+        process: psutil.Process or None = self.tracked.get(pid)
+        if process is not None:
+            return process.is_running()
+        return pid in self.refresh()
+
+    def terminate(self, pids: List[int], timeout: float = 5.) -> List[int]:
+        processes: Dict[int, psutil.Process] = {}
+        with self.lock:
+            for pid in pids:
+                for target in [pid] + sorted(self.children.get(pid, set())):
+                    process: psutil.Process or None = self.tracked.get(target)
+                    if process is None:
+                        try:
+                            process = psutil.Process(target)
+                        except psutil.NoSuchProcess:
+                            continue
+                    processes[target] = process
+
+        denied: List[int] = []
+        for pid, process in list(processes.items()):
+            try:
+                process.terminate()
+            except psutil.NoSuchProcess:
+                processes.pop(pid)
+            except psutil.AccessDenied:
+                processes.pop(pid)
+                denied.append(pid)
+
+        _, alive = psutil.wait_procs(list(processes.values()), timeout=timeout)
+        for process in alive:
+            try:
+                process.kill()
+            except psutil.Error:
+                pass
+        if alive:
+            psutil.wait_procs(alive, timeout=timeout)
+
+        for pid in pids:
+            self.untrack(pid=pid)
+        self.refreshed_at = None
+        return denied
+
+    def kill_names(self, names: List[str], timeout: float = 5.) -> List[int]:
+        pids: List[int] = [pid for pid, proc_name in self.refresh(force=True).items()
+                           if any(name in proc_name for name in names)]
+        return self.terminate(pids=pids, timeout=timeout)
+
+    def shutdown(self, timeout: float = 5.) -> List[int]:
+        with self.lock:
+            pids: List[int] = [pid for pid in self.tracked if not any(pid in c for c in self.children.values())]
+        return self.terminate(pids=pids, timeout=timeout)
+
+
+registry: ProcessRegistry = ProcessRegistry()
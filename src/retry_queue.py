@@ -0,0 +1,96 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+from data_structures import BranchInfo
+
+
+class FailureKind:
+    COLVIR_ERROR = 'colvir_error'
+    CONVERSION_ERROR = 'conversion_error'
+    DELIVERY_ERROR = 'delivery_error'
+    TIMEOUT = 'timeout'
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int
+    base_delay: float
+    factor: float = 2.
+    max_delay: float = 30 * 60
+
+    def get_delay(self, attempt: int) -> float:
+        return min(self.base_delay * self.factor ** (attempt - 1), self.max_delay)
+
+
+@dataclass
+class Rejection:
+    branch_info: BranchInfo
+    kind: str
+    attempts: int = 0
+    kind_attempts: Dict[str, int] = field(default_factory=dict)
+    next_at: float or None = None
+    retrying: bool = False
+    errors: List[str] = field(default_factory=list)
+
+
+class RejectionQueue:
+    def __init__(self, policies: Dict[str, RetryPolicy] = None) -> None:
+        self.policies: Dict[str, RetryPolicy] = policies if policies else {
+            FailureKind.COLVIR_ERROR: RetryPolicy(max_attempts=3, base_delay=60),
+            FailureKind.CONVERSION_ERROR: RetryPolicy(max_attempts=2, base_delay=30),
+            FailureKind.DELIVERY_ERROR: RetryPolicy(max_attempts=3, base_delay=5 * 60),
+            FailureKind.TIMEOUT: RetryPolicy(max_attempts=2, base_delay=5 * 60),
+        }
+        self.entries: Dict[str, Rejection] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def is_rejected(self, branch_info: BranchInfo) -> bool:
+        entry: Rejection or None = self.entries.get(branch_info.job_id)
+        return entry is not None and not entry.retrying
+
+    def reject(self, branch_info: BranchInfo, kind: str, error: str = None) -> bool:
+        entry: Rejection = self.entries.setdefault(branch_info.job_id, Rejection(branch_info=branch_info, kind=kind))
+        if not entry.retrying and entry.attempts:
+            return entry.next_at is not None
+        entry.kind = kind
+        entry.retrying = False
+        entry.attempts += 1
+        entry.kind_attempts[kind] = entry.kind_attempts.get(kind, 0) + 1
+        entry.errors.append(f'{kind}: {error}' if error else kind)
+
+        policy: RetryPolicy = self.policies[kind]
+        attempts: int = entry.kind_attempts[kind]
+        entry.next_at = time.monotonic() + policy.get_delay(attempt=attempts) if attempts < policy.max_attempts else None
+        return entry.next_at is not None
+
+    def resolve(self, branch_info: BranchInfo) -> None:
+        self.entries.pop(branch_info.job_id, None)
+
+    def has_pending(self) -> bool:
+        return any(entry.next_at is not None and not entry.retrying for entry in self.entries.values())
+
+    def next_due(self) -> float or None:
+        return min((entry.next_at for entry in self.entries.values() if entry.next_at is not None and not entry.retrying), default=None)
+
+    def pop_due(self) -> List[Rejection]:
+        now: float = time.monotonic()
+        due: List[Rejection] = [entry for entry in self.entries.values()
+                                if entry.next_at is not None and not entry.retrying and entry.next_at <= now]
+        for entry in due:
+            entry.retrying = True
+        return due
+
+    def failures(self) -> List[Rejection]:
+        return [entry for entry in self.entries.values() if entry.next_at is None and not entry.retrying]
+
+    def report(self) -> str:
+        failures: List[Rejection] = self.failures()
+        if not failures:
+            return 'All rejected jobs were recovered'
+        lines: List[str] = [f'{len(failures)} jobs failed after retries:']
+        for entry in failures:
+            b: BranchInfo = entry.branch_info
+            lines.append(f'{b.action}\t{b.branch}\t{b.account}\t{b.date_from}..{b.date_to}\t{entry.attempts} attempts\t{entry.errors[-1]}')
+        return '\n'.join(lines)
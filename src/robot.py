@@ -1,38 +1,33 @@
+import getpass
 import os
 import pathlib
-import platform
-import shutil
-from dataclasses import dataclass
-from time import sleep
-from typing import List
-import openpyxl
+import time
+from typing import List, Dict, Tuple, Iterator
 import psutil
-import win32com.client as win32
-from openpyxl.workbook.workbook import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
-from pywinauto import Application
-from pywinauto.application import ProcessNotFoundError
-from pywinauto.controls.hwndwrapper import InvalidWindowHandle
 from bot_notification import TelegramNotifier
-from colvir import Colvir
-from data_structures import BranchInfo, Credentials, Process
-
-
-@dataclass
-class FilesInfo:
-    path: str
-    name: str
-    full_path: str or None = None
-    pid: int or None = None
-
-    def __post_init__(self) -> None:
-        self.full_path: str = os.path.join(self.path, self.name)
-        pid: str = self.name[:self.name.find('_')]
-        self.pid = int(pid)
+from concurrency import ConcurrencyController
+from data_structures import BranchInfo, Credentials, Process, FilesInfo, get_export_root
+from delivery import DeliveryService
+from durations import DurationHistory
+from excel_converter import ConverterService
+from desktop import SessionState, WindowsDesktop
+from export_scanner import ExportScanner
+from job_queue import JobQueue
+from journal import JobStage, RunJournal
+from ledger import CompletionLedger
+from retry_queue import FailureKind, RejectionQueue
+from scheduler import SessionScheduler
+from timing import Timer
+from xlsb_probe import XlsbProbe
 
 
 class Robot:
-    def __init__(self, credentials: Credentials, process: Process, notifier: TelegramNotifier, data: List[BranchInfo]) -> None:
+    def __init__(self, credentials: Credentials, process: Process, notifier: TelegramNotifier, data: List[BranchInfo],
+                 ledger: CompletionLedger = None, history: DurationHistory = None, job_queue: JobQueue = None,
+                 journal: RunJournal = None, timer: Timer = None, desktop: WindowsDesktop = None,
+                 rejections: RejectionQueue = None, export_root: str = None, concurrency: int = 20,
+                 session_timeout: float or None = 2 * 60 * 60, poll_interval: float = 5.,
+                 controller: ConcurrencyController = None, delivery: DeliveryService = None, gone_grace: float = 60.) -> None:
         self.credentials: Credentials = credentials
         self.process: Process = process
         self.pids: List[int] = []
@@ -40,171 +35,422 @@ class Robot:
         self.data: List[BranchInfo] = data
 
         self.notifier = notifier
+        self.ledger: CompletionLedger = ledger if ledger else CompletionLedger()
+        self.history: DurationHistory = history if history else DurationHistory()
+        self.start_times: Dict[int, float] = {}
+        self.opened_at: Dict[int, float] = {}
+        self.job_queue: JobQueue or None = job_queue
+        self.journal: RunJournal = journal if journal else RunJournal(path=RunJournal.get_default_path(data=self.data))
+        self.timer: Timer = timer if timer else Timer(path=Timer.get_default_path(data=self.data))
+        self.desktop: WindowsDesktop = desktop if desktop else WindowsDesktop(credentials=credentials, process=process, timer=self.timer)
 
         self.kill_colvirs()
 
-        self.chunk_number: int = 20
-        self.chunks: List[List[BranchInfo]] = [self.data[i:i + self.chunk_number] for i in
-                                               range(0, len(self.data), self.chunk_number)]
-        self.done_files: List[str] = []
-        self.username: str = os.getlogin()
+        self.controller: ConcurrencyController = controller if controller else ConcurrencyController(initial=concurrency)
+        self.concurrency: int = self.controller.initial
+        self.session_timeout: float or None = session_timeout
+        self.poll_interval: float = poll_interval
+        self.gone_grace: float = gone_grace
+        self.gone_at: Dict[str, float] = {}
+        self.started: int = 0
+        self.launches_paused: bool = False
+        self.scanner: ExportScanner = ExportScanner(root=export_root if export_root else get_export_root())
+        self.username: str = getpass.getuser()
         self.counter: int = 0
         self.pids_number: int = 0
 
-        self.rejected_data: List[BranchInfo] = []
+        self.rejections: RejectionQueue = rejections if rejections is not None else RejectionQueue()
+
+        self.branch_index: Dict[Tuple[str, str], BranchInfo] = {}
+        self.export_index: Dict[Tuple[str, str], BranchInfo] = {}
+        self.export_keys: Dict[int, Tuple[str, str]] = {}
+        for branch_info in self.data:
+            self.add_job(branch_info=branch_info)
 
-        self.excel = win32.gencache.EnsureDispatch('Excel.Application')
-        self.excel.DisplayAlerts = False
+        self.converter: ConverterService = ConverterService(backend=self.desktop.converter_backend,
+                                                            backend_kwargs=self.desktop.converter_kwargs)
+        self.delivery: DeliveryService = delivery if delivery else DeliveryService()
 
     def kill_colvirs(self) -> None:
-        for proc in psutil.process_iter():
-            if not any(process_name in proc.name() for process_name in [self.process.name, 'EXCEL']):
-                continue
-            try:
-                p: psutil.Process = psutil.Process(proc.pid)
-                p.terminate()
-            except psutil.AccessDenied:
-                if 'EXCEL' in proc.name():
-                    continue
-                self.restricted_pids.append(proc.pid)
-                continue
+        self.restricted_pids.extend(self.desktop.kill_all(names=[self.process.name, 'EXCEL']))
 
     def kill_process(self, pid) -> None:
         self.pids.remove(pid)
-        p: psutil.Process = psutil.Process(pid)
-        p.terminate()
-
-    def close_sessions(self) -> None:
-        files_info: List[FilesInfo] = []
-        for path, subdirs, files in os.walk(r'C:\xls' if platform.node() == 'robot-7' else r'\\robot-7\c$\2txls'):
-            for name in files:
-                if name in self.done_files or 'xlsx' in name:
-                    continue
-                files_info.append(FilesInfo(path=path, name=name))
+        self.desktop.kill(pid=pid)
 
-        for file_info in files_info:
+    def close_sessions(self) -> List[int]:
+        finished_pids: List[int] = []
+        for file_info in self.scanner.poll():
             path = file_info.path
             name = file_info.name
             full_path = file_info.full_path
             pid = file_info.pid
-            if not os.path.exists(path=full_path) \
-                    and os.path.getsize(filename=full_path) == 0:
+            try:
+                size: int = os.path.getsize(filename=full_path)
+            except OSError:
                 continue
             try:
-                app: Application = Application(backend='win32').connect(process=pid)
+                state: str = self.desktop.get_session_state(pid=pid)
+                if state == SessionState.GONE:
+                    gone_at: float = self.gone_at.setdefault(full_path, time.monotonic())
+                    if pid in self.pids and time.monotonic() - gone_at < self.gone_grace:
+                        self.scanner.defer(file_info=file_info)
+                        continue
+                    self.gone_at.pop(full_path, None)
+                    if self.close_gone_session(file_info=file_info):
+                        finished_pids.append(pid)
+                    continue
+                if size == 0:
+                    self.scanner.defer(file_info=file_info)
+                    continue
                 branch_info = self.find_branch_info(xls_path=path, xls_name=name)
-                if branch_info not in self.rejected_data and self.is_errored(app=app):
-                    self.rejected_data.append(branch_info)
+                if (branch_info is None or not self.rejections.is_rejected(branch_info=branch_info)) and state == SessionState.ERRORED:
+                    self.reject(branch_info=branch_info, pid=pid, reason='Ошибка при обработке', kind=FailureKind.COLVIR_ERROR)
+                    self.controller.record(success=False)
+                    self.scanner.mark_rejected(file_info=file_info)
+                    self.kill_process(pid=pid)
+                    finished_pids.append(pid)
                     continue
-                if not any('Выбор отчета' in win.window_text() for win in app.windows()):
+                if state != SessionState.READY:
+                    self.scanner.defer(file_info=file_info)
                     continue
                 try:
                     os.rename(src=full_path, dst=full_path)
                 except OSError:
+                    self.scanner.defer(file_info=file_info)
                     continue
+                if branch_info and self.journal.get_stage(branch_info=branch_info) != JobStage.EXPORTED:
+                    self.journal.record(branch_info=branch_info, stage=JobStage.EXPORTED, xls_path=full_path)
                 if not self.is_correct_file(root=path, xls_file_path=name):
+                    self.scanner.defer(file_info=file_info)
                     continue
+                if branch_info:
+                    self.journal.record(branch_info=branch_info, stage=JobStage.VALIDATED, xls_path=full_path)
                 self.kill_process(pid=pid)
+                finished_pids.append(pid)
+                self.record_export_timings(pid=pid, branch_info=branch_info, full_path=full_path)
+                self.record_duration(pid=pid, branch_info=branch_info)
+                self.controller.record(success=True)
                 self.counter += 1
                 message = f'{self.counter}/{self.pids_number}\t{pid} was terminated'
                 print(message)
                 self.notifier.send_notification(message=message)
-                self.done_files.append(name)
+                self.scanner.mark_done(file_info=file_info)
                 self.convert_to_xlsb(xls_path=path, xls_name=name)
-            except (ValueError, ProcessNotFoundError, InvalidWindowHandle):
+            except (ValueError, psutil.NoSuchProcess):
+                self.scanner.defer(file_info=file_info)
                 continue
+        self.collect_conversions()
+        self.collect_deliveries()
+        return finished_pids
 
-    @staticmethod
-    def is_errored(app):
-        for win in app.windows():
-            text = win.window_text()
-            if text != 'Выбор отчета':
-                continue
-            win2 = app.window(handle=win.handle)
-            for child in win2.iter_descendants():
-                if 'Ошибка при обработке' in child.window_text():
-                    return True
-        return False
+    def close_gone_session(self, file_info: FilesInfo) -> bool:
+        pid: int = file_info.pid
+        tracked: bool = pid in self.pids
+        if tracked:
+            self.kill_process(pid=pid)
+        branch_info: BranchInfo or None = self.find_branch_info(xls_path=file_info.path, xls_name=file_info.name)
+        if os.path.getsize(file_info.full_path) == 0 or not self.is_correct_file(root=file_info.path, xls_file_path=file_info.name):
+            print(f'{pid} is gone and left an invalid export {file_info.full_path}')
+            if tracked:
+                self.reject(branch_info=branch_info, pid=pid, reason='Colvir exited without a valid export',
+                            kind=FailureKind.COLVIR_ERROR)
+                self.controller.record(success=False)
+            self.scanner.mark_rejected(file_info=file_info)
+            return tracked
+        stage: str or None = self.journal.get_stage(branch_info=branch_info) if branch_info else None
+        if not tracked and stage in (JobStage.VALIDATED, JobStage.CONVERTED, JobStage.DELIVERED):
+            self.scanner.mark_done(file_info=file_info)
+            return False
+        print(f'{pid} is gone, picking up its export {file_info.full_path}')
+        if branch_info:
+            self.journal.record(branch_info=branch_info, stage=JobStage.VALIDATED, xls_path=file_info.full_path)
+        if tracked:
+            self.record_export_timings(pid=pid, branch_info=branch_info, full_path=file_info.full_path)
+            self.record_duration(pid=pid, branch_info=branch_info)
+            self.controller.record(success=True)
+            self.counter += 1
+        self.scanner.mark_done(file_info=file_info)
+        self.convert_to_xlsb(xls_path=file_info.path, xls_name=file_info.name)
+        return tracked
 
     def is_correct_file(self, root: str, xls_file_path: str) -> bool:
-        xls_file_path = os.path.join(root, xls_file_path)
-        shutil.copyfile(src=xls_file_path, dst=f'{xls_file_path}_copy.xls')
-        xls_file_path = f'{xls_file_path}_copy.xls'
-        xlsx_file_path = xls_file_path + 'x'
+        return self.desktop.validate_export(full_path=os.path.join(root, xls_file_path))
 
-        if not os.path.exists(path=xlsx_file_path):
-            wb = self.excel.Workbooks.Open(xls_file_path)
-            wb.SaveAs(xlsx_file_path, FileFormat=51)
-            wb.Close()
+    @staticmethod
+    def get_index_key(path: str, name: str) -> Tuple[str, str]:
+        return os.path.normcase(os.path.normpath(path)), os.path.normcase(name)
 
-        workbook: Workbook = openpyxl.load_workbook(xlsx_file_path, data_only=True)
-        sheet: Worksheet = workbook.active
-        os.unlink(xlsx_file_path)
-        os.unlink(xls_file_path)
+    def add_job(self, branch_info: BranchInfo) -> None:
+        self.branch_index[self.get_index_key(path=branch_info.save_path, name=branch_info.file_name)] = branch_info
 
-        return next((True for row in sheet.iter_rows(max_row=50) for cell in row if cell.has_style), False)
+    def register_export(self, pid: int, branch_info: BranchInfo) -> None:
+        key: Tuple[str, str] = self.get_index_key(path=branch_info.save_path, name=f'{pid}_{branch_info.file_name}')
+        self.export_index[key] = branch_info
+        self.export_keys[pid] = key
 
-    def find_branch_info(self, xls_path, xls_name):
-        b_info: BranchInfo or None = None
-        for branch_info in self.data:
-            path, name = branch_info.save_path, branch_info.file_name
-            if os.path.join(xls_path, xls_name[xls_name.find('_') + 1::]) != os.path.join(path, name):
-                continue
-            b_info = branch_info
-        return b_info
+    def unregister_export(self, pid: int) -> None:
+        key: Tuple[str, str] or None = self.export_keys.pop(pid, None)
+        if key:
+            self.export_index.pop(key, None)
+
+    def reject(self, branch_info: BranchInfo or None, pid: int or None = None, reason: str = None,
+               kind: str = FailureKind.COLVIR_ERROR) -> None:
+        if branch_info is not None and not self.rejections.is_rejected(branch_info=branch_info):
+            will_retry: bool = self.rejections.reject(branch_info=branch_info, kind=kind, error=reason)
+            self.journal.record(branch_info=branch_info, stage=JobStage.REJECTED, kind=kind, reason=reason)
+            if self.job_queue and not will_retry:
+                self.job_queue.fail(job_id=branch_info.job_id)
+        if pid is not None:
+            self.unregister_export(pid=pid)
+
+    def find_branch_info(self, xls_path: str, xls_name: str) -> BranchInfo or None:
+        b_info: BranchInfo or None = self.export_index.get(self.get_index_key(path=xls_path, name=xls_name))
+        if b_info:
+            return b_info
+        return self.branch_index.get(self.get_index_key(path=xls_path, name=xls_name[xls_name.find('_') + 1::]))
 
     def convert_to_xlsb(self, xls_path: str, xls_name: str) -> None:
         b_info = self.find_branch_info(xls_path=xls_path, xls_name=xls_name)
         full_xls_path = os.path.join(xls_path, xls_name)
+        pid = FilesInfo(path=xls_path, name=xls_name).pid
+        self.unregister_export(pid=pid)
         if not b_info:
             print(f'Branch info not found for {full_xls_path}')
             return
-        full_xlsb_path = os.path.join(b_info.final_save_path, b_info.final_name)
+        self.submit_conversion(branch_info=b_info, full_xls_path=full_xls_path)
 
-        try:
-            wb = self.excel.Workbooks.Open(full_xls_path)
-            wb.SaveAs(full_xlsb_path, 50)
-            wb.Close()
-            message = f'{full_xlsb_path} successfully converted'
-            print(message)
-            os.unlink(full_xls_path)
-        except Exception as e:
-            message = f'could not convert {xls_name}'
-            self.rejected_data.append(b_info)
-            print(str(e), message)
-            pass
+    def submit_conversion(self, branch_info: BranchInfo, full_xls_path: str) -> None:
+        staged_xlsb_path = self.delivery.get_staging_path(name=f'{branch_info.job_id}_{branch_info.final_name}')
+        self.converter.submit(src_file=full_xls_path, dst_file=staged_xlsb_path, remove_src=True, tag=branch_info)
+
+    def submit_delivery(self, branch_info: BranchInfo, staged_xlsb_path: str) -> None:
+        full_xlsb_path = os.path.join(branch_info.final_save_path, branch_info.final_name)
+        self.delivery.submit(src_file=staged_xlsb_path, dst_file=full_xlsb_path, tag=branch_info)
+
+    def collect_conversions(self) -> None:
+        for result in self.converter.drain():
+            self.timer.record(stage='convert_to_xlsb', seconds=result.duration, branch_info=result.tag,
+                              error=result.error)
+            if result.success:
+                print(f'{result.job.dst_file} successfully converted')
+                self.journal.record(branch_info=result.tag, stage=JobStage.CONVERTED, xlsb_path=result.job.dst_file)
+                self.submit_delivery(branch_info=result.tag, staged_xlsb_path=result.job.dst_file)
+                continue
+            self.reject(branch_info=result.tag, reason=result.error, kind=FailureKind.CONVERSION_ERROR)
+            print(result.error, f'could not convert {os.path.basename(result.job.src_file)}')
+
+    def collect_deliveries(self) -> None:
+        for result in self.delivery.drain():
+            self.timer.record(stage='deliver', seconds=result.duration, branch_info=result.tag, attempts=result.job.attempts,
+                              size=result.size, error=result.error)
+            if result.success:
+                print(f'{result.job.dst_file} delivered, sha256 {result.checksum}')
+                self.deliver(branch_info=result.tag, full_xlsb_path=result.job.dst_file)
+                continue
+            self.reject(branch_info=result.tag, reason=result.error, kind=FailureKind.DELIVERY_ERROR)
+            print(result.error, f'could not deliver {result.job.dst_file}')
+
+    def deliver(self, branch_info: BranchInfo, full_xlsb_path: str) -> None:
+        self.ledger.record(path=full_xlsb_path, row_count=XlsbProbe.probe_placeholder_rows(file_path=full_xlsb_path))
+        self.journal.record(branch_info=branch_info, stage=JobStage.DELIVERED)
+        self.rejections.resolve(branch_info=branch_info)
+        if self.job_queue:
+            self.job_queue.complete(job_id=branch_info.job_id)
+
+    def resume(self, data: List[BranchInfo]) -> List[BranchInfo]:
+        left: List[BranchInfo] = []
+        for branch_info in data:
+            stage: str or None = self.journal.get_stage(branch_info=branch_info)
+            details: Dict = self.journal.get_details(branch_info=branch_info)
+            if stage == JobStage.DELIVERED:
+                if self.job_queue:
+                    self.job_queue.complete(job_id=branch_info.job_id)
+                continue
+            full_xlsb_path: str = os.path.join(branch_info.final_save_path, branch_info.final_name)
+            if stage == JobStage.CONVERTED and os.path.exists(full_xlsb_path):
+                self.deliver(branch_info=branch_info, full_xlsb_path=full_xlsb_path)
+                continue
+            staged_xlsb_path: str or None = details.get('xlsb_path')
+            if stage in (JobStage.CONVERTED, JobStage.REJECTED) and staged_xlsb_path and staged_xlsb_path != full_xlsb_path \
+                    and os.path.exists(staged_xlsb_path):
+                print(f'resuming delivery of {staged_xlsb_path}')
+                self.submit_delivery(branch_info=branch_info, staged_xlsb_path=staged_xlsb_path)
+                continue
+
+            xls_path: str or None = details.get('xls_path')
+            if stage not in (JobStage.EXPORTED, JobStage.VALIDATED, JobStage.CONVERTED, JobStage.REJECTED) \
+                    or not xls_path or not os.path.exists(xls_path):
+                left.append(branch_info)
+                continue
+            if stage in (JobStage.EXPORTED, JobStage.REJECTED):
+                if not self.is_correct_file(root=os.path.dirname(xls_path), xls_file_path=os.path.basename(xls_path)):
+                    left.append(branch_info)
+                    continue
+                self.journal.record(branch_info=branch_info, stage=JobStage.VALIDATED, xls_path=xls_path)
+            print(f'resuming {xls_path} from {stage}')
+            self.scanner.mark_done(file_info=FilesInfo(path=os.path.dirname(xls_path), name=os.path.basename(xls_path)))
+            self.submit_conversion(branch_info=branch_info, full_xls_path=xls_path)
+        return left
 
     def create_folder_structure(self):
         for branch_info in self.data:
             pathlib.Path(branch_info.final_save_path).mkdir(parents=True, exist_ok=True)
 
+    def start(self, branch_info: BranchInfo) -> int or None:
+        self.started += 1
+        message = f'{self.started}/{len(self.data)} {branch_info}'
+        print(message)
+        started: float = time.monotonic()
+        self.add_job(branch_info=branch_info)
+        pathlib.Path(branch_info.final_save_path).mkdir(parents=True, exist_ok=True)
+        pid: int or None = self.desktop.open_session(branch_info=branch_info, pids=self.pids, restricted_pids=self.restricted_pids)
+        if pid is None:
+            self.reject(branch_info=branch_info, reason='could not open Colvir session')
+            self.controller.record(success=False)
+            return None
+        self.journal.record(branch_info=branch_info, stage=JobStage.SESSION_OPENED, pid=pid)
+        self.notifier.send_notification(message=f'{self.started}/{len(self.data)}')
+        self.pids.append(pid)
+        self.start_times[pid] = started
+        self.opened_at[pid] = time.time()
+        self.register_export(pid=pid, branch_info=branch_info)
+        print(self.pids)
+        return pid
+
+    def record_duration(self, pid: int, branch_info: BranchInfo or None) -> None:
+        started: float or None = self.start_times.pop(pid, None)
+        if started is None or branch_info is None:
+            return
+        seconds: float = time.monotonic() - started
+        self.history.record(branch_info=branch_info, seconds=seconds)
+        self.timer.record(stage='session', seconds=seconds, branch_info=branch_info, pid=pid)
+
+    def record_export_timings(self, pid: int, branch_info: BranchInfo or None, full_path: str) -> None:
+        opened_at: float or None = self.opened_at.pop(pid, None)
+        try:
+            modified_at: float = os.path.getmtime(full_path)
+        except OSError:
+            return
+        if opened_at is not None:
+            self.timer.record(stage='report_generation', seconds=max(modified_at - opened_at, 0.), branch_info=branch_info, pid=pid)
+        self.timer.record(stage='detection_lag', seconds=max(time.time() - modified_at, 0.), branch_info=branch_info, pid=pid)
+
+    def poll(self) -> List[int]:
+        self.renew_leases()
+        return self.close_sessions()
+
+    def renew_leases(self) -> None:
+        if self.job_queue:
+            self.job_queue.beat()
+
+    def sleep(self, seconds: float) -> None:
+        deadline: float = time.monotonic() + seconds
+        while True:
+            left: float = deadline - time.monotonic()
+            if left <= 0:
+                return
+            self.renew_leases()
+            time.sleep(min(left, self.poll_interval))
+
+    def wait(self, timeout: float) -> None:
+        self.scanner.wait(timeout=timeout)
+
+    def paused(self) -> bool:
+        paused: bool = self.desktop.is_paused()
+        if paused != self.launches_paused:
+            self.launches_paused = paused
+            print('too many login failures, pausing new Colvir sessions' if paused else 'resuming new Colvir sessions')
+        return paused
+
+    def cancel(self, pid: int) -> None:
+        key: Tuple[str, str] or None = self.export_keys.get(pid)
+        branch_info: BranchInfo or None = self.export_index.get(key) if key else None
+        print(f'{pid} timed out, terminating')
+        self.controller.record(success=False)
+        self.opened_at.pop(pid, None)
+        if pid in self.start_times and branch_info:
+            self.timer.record(stage='session', seconds=time.monotonic() - self.start_times.pop(pid), branch_info=branch_info,
+                              pid=pid, error='timeout')
+        if branch_info:
+            self.reject(branch_info=branch_info, pid=pid, reason='session timed out', kind=FailureKind.TIMEOUT)
+        try:
+            self.kill_process(pid=pid)
+        except (ValueError, psutil.NoSuchProcess):
+            pass
+
+    def iter_queue_jobs(self) -> Iterator[BranchInfo]:
+        for branch_info in self.job_queue.iter_leases():
+            yield from self.resume(data=[branch_info])
+
+    def retry_rejected(self, scheduler: SessionScheduler) -> None:
+        while True:
+            deadline: float = time.monotonic() + self.converter.timeout * (self.converter.retries + 1)
+            while not self.converter.join(timeout=self.poll_interval) and time.monotonic() < deadline:
+                self.renew_leases()
+            self.collect_conversions()
+            while not self.delivery.join(timeout=self.poll_interval):
+                self.renew_leases()
+            self.collect_deliveries()
+            if not self.rejections.has_pending():
+                return
+            self.sleep(seconds=self.rejections.next_due() - time.monotonic())
+
+            jobs: List[BranchInfo] = []
+            for entry in self.rejections.pop_due():
+                print(f'retrying {entry.branch_info} after {entry.kind}, attempt {entry.attempts + 1}')
+                details: Dict = self.journal.get_details(branch_info=entry.branch_info)
+                xls_path: str or None = details.get('xls_path')
+                xlsb_path: str or None = details.get('xlsb_path')
+                if entry.kind == FailureKind.DELIVERY_ERROR and xlsb_path and os.path.exists(xlsb_path):
+                    self.submit_delivery(branch_info=entry.branch_info, staged_xlsb_path=xlsb_path)
+                    continue
+                if entry.kind == FailureKind.CONVERSION_ERROR and xls_path and os.path.exists(xls_path):
+                    self.submit_conversion(branch_info=entry.branch_info, full_xls_path=xls_path)
+                    continue
+                jobs.append(entry.branch_info)
+            scheduler.run(jobs=jobs)
+
     def run(self) -> None:
         self.create_folder_structure()
+        self.converter.start()
+        self.delivery.start()
 
-        for i, chunk in enumerate(self.chunks):
-            for j, branch_info in enumerate(chunk, start=(i * self.chunk_number)):
-                message = f'{j + 1}/{len(self.data)} {branch_info}'
-                print(message)
-                colvir: Colvir = Colvir(
-                    pids=self.pids,
-                    restricted_pids=self.restricted_pids,
-                    credentials=self.credentials,
-                    process=self.process,
-                    data=branch_info
-                )
-                colvir.open()
-                self.notifier.send_notification(message=f'{j + 1}/{len(self.data)}')
-                self.pids.append(colvir.pid)
-                print(self.pids)
-            self.notifier.send_notification(message=f'{len(self.pids)} processes are opened, starting to close sessions')
-            self.counter = 0
-            self.pids_number = len(self.pids)
-            self.close_sessions()
-            sleep(len(self.pids) * 20)
-            self.close_sessions()
-        self.pids_number = len(self.pids)
-        while self.pids:
-            self.close_sessions()
+        self.counter = 0
+        self.pids_number = len(self.data)
+        scheduler: SessionScheduler = SessionScheduler(backend=self, concurrency=self.concurrency,
+                                                       session_timeout=self.session_timeout, poll_interval=self.poll_interval,
+                                                       controller=self.controller)
+        if not self.job_queue:
+            scheduler.run(jobs=self.resume(data=self.data))
+            self.retry_rejected(scheduler=scheduler)
+        else:
+            while True:
+                scheduler.run(jobs=self.iter_queue_jobs())
+                self.retry_rejected(scheduler=scheduler)
+                if self.job_queue.is_drained():
+                    break
+                self.sleep(seconds=60)
+
+        self.history.save()
+        self.converter.close()
+        self.collect_conversions()
+        self.delivery.close()
+        self.collect_deliveries()
+        print(self.converter.metrics())
+        print(self.delivery.metrics())
+        print(self.desktop.report())
+        print(self.timer.report())
+        print(self.controller.report())
+        self.timer.write_summary()
+
+        report: str = self.rejections.report()
+        print(report)
+        self.notifier.send_notification(message=report)
 
         self.notifier.send_notification(message='Completed')
-        self.excel.Quit()
+        self.scanner.close()
+        self.journal.close()
+        self.timer.close()
+        self.controller.close()
+        self.desktop.close()
@@ -0,0 +1,114 @@
+import heapq
+import itertools
+import random
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+
+class SessionScheduler:
+    def __init__(self, backend, concurrency: int = 20, session_timeout: float or None = None,
+                 poll_interval: float = 5., on_finish: Callable[[Any], None] or None = None, controller=None) -> None:
+        self.backend = backend
+        self.controller = controller
+        self.on_finish: Callable[[Any], None] or None = on_finish
+        self.concurrency: int = concurrency
+        self.session_timeout: float or None = session_timeout
+        self.poll_interval: float = poll_interval
+
+        self.in_flight: Dict[Any, Tuple[Any, float]] = {}
+        self.started: int = 0
+        self.finished: int = 0
+        self.failed_starts: int = 0
+        self.timed_out: int = 0
+
+    def run(self, jobs: Iterable[Any]) -> None:
+        queue: Iterator[Any] = iter(jobs)
+        exhausted: bool = False
+        while not exhausted or self.in_flight:
+            if self.controller:
+                self.concurrency = self.controller.adjust(concurrency=self.concurrency, in_flight=len(self.in_flight))
+            if not exhausted and len(self.in_flight) < self.concurrency and not self.backend.paused():
+                job: Any = next(queue, None)
+                if job is None:
+                    exhausted = True
+                    continue
+                self.start(job=job)
+                self.collect()
+                continue
+
+            if not self.collect():
+                self.backend.wait(timeout=self.poll_interval)
+
+    def start(self, job: Any) -> None:
+        session: Any = self.backend.start(job)
+        if session is None:
+            self.failed_starts += 1
+            return
+        self.started += 1
+        self.in_flight[session] = (job, time.monotonic())
+
+    def collect(self) -> int:
+        finished: List[Tuple[Any, float]] = [self.in_flight.pop(session) for session in self.backend.poll() if session in self.in_flight]
+        self.finished += len(finished)
+        if self.on_finish:
+            for job, _ in finished:
+                self.on_finish(job)
+        return len(finished) + self.expire()
+
+    def expire(self) -> int:
+        if self.session_timeout is None:
+            return 0
+        deadline: float = time.monotonic() - self.session_timeout
+        expired: List[Any] = [session for session, (_, started) in self.in_flight.items() if started < deadline]
+        for session in expired:
+            del self.in_flight[session]
+            self.timed_out += 1
+            self.backend.cancel(session)
+        return len(expired)
+
+
+class SimulatedBackend:
+    def __init__(self, duration: Callable[[Any], float] = lambda job: random.uniform(.01, .05),
+                 error_rate: float = 0.) -> None:
+        self.duration: Callable[[Any], float] = duration
+        self.error_rate: float = error_rate
+        self.session_ids = itertools.count(1)
+        self.pending: List[Tuple[float, int]] = []
+        self.jobs: Dict[int, Any] = {}
+        self.completed: List[Any] = []
+        self.errored: List[Any] = []
+        self.cancelled: List[Any] = []
+        self.max_in_flight: int = 0
+
+    def start(self, job: Any) -> int:
+        session: int = next(self.session_ids)
+        self.jobs[session] = job
+        heapq.heappush(self.pending, (time.monotonic() + self.duration(job), session))
+        self.max_in_flight = max(self.max_in_flight, len(self.jobs))
+        return session
+
+    def poll(self) -> List[int]:
+        finished: List[int] = []
+        now: float = time.monotonic()
+        while self.pending and self.pending[0][0] <= now:
+            _, session = heapq.heappop(self.pending)
+            job: Any = self.jobs.pop(session, None)
+            if job is None:
+                continue
+            (self.errored if random.random() < self.error_rate else self.completed).append(job)
+            finished.append(session)
+        return finished
+
+    def paused(self) -> bool:
+        return False
+
+    def wait(self, timeout: float) -> None:
+        if not self.pending:
+            time.sleep(timeout)
+            return
+        time.sleep(min(max(self.pending[0][0] - time.monotonic(), 0.), timeout))
+
+    def cancel(self, session: int) -> None:
+        job: Any = self.jobs.pop(session, None)
+        if job is not None:
+            self.cancelled.append(job)
@@ -0,0 +1,294 @@
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+from concurrency import ConcurrencyController
+from data_structures import BranchInfo, Credentials, Process
+from delivery import DeliveryService
+from desktop import SessionState
+from durations import DurationHistory
+from job_queue import JobQueue
+from journal import JobStage, RunJournal
+from ledger import CompletionLedger
+from retry_queue import FailureKind, RejectionQueue, RetryPolicy
+from robot import Robot
+from scheduler import SessionScheduler, SimulatedBackend
+from timing import Timer
+
+REPORT_SECONDS: Dict[str, float] = {
+    'Z_160_GL_003': 900,
+    'Z_160_GL_020': 240,
+    'S_CLI_003': 120,
+    'S_CLI_004': 180,
+    'S_CLI_013': 300,
+    'S_CLI_014': 300,
+}
+
+
+@dataclass
+class SimulatedSession:
+    pid: int
+    branch_info: BranchInfo
+    ready_at: float
+    errored: bool
+    written: bool = False
+    killed: bool = False
+
+
+class NullNotifier:
+    def send_notification(self, message: str) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class SimulatedDesktop:
+    def __init__(self, time_scale: float = .001, launch_seconds: Callable[[random.Random], float] = None,
+                 report_seconds: Callable[[random.Random, BranchInfo], float] = None, error_rate: float = 0.,
+                 launch_error_rate: float = 0., export_size: int = 32 * 1024, seed: int = None) -> None:
+        self.time_scale: float = time_scale
+        self.random: random.Random = random.Random(seed)
+        self.launch_seconds: Callable[[random.Random], float] = launch_seconds if launch_seconds \
+            else lambda r: r.uniform(15, 30)
+        self.report_seconds: Callable[[random.Random, BranchInfo], float] = report_seconds if report_seconds \
+            else lambda r, b: r.lognormvariate(0, .5) * REPORT_SECONDS[b.action]
+        self.error_rate: float = error_rate
+        self.launch_error_rate: float = launch_error_rate
+        self.export_size: int = export_size
+        self.converter_backend: str = 'copy'
+        self.converter_kwargs: Dict = {}
+
+        self.pid_counter: itertools.count = itertools.count(10000)
+        self.sessions: Dict[int, SimulatedSession] = {}
+        self.pending: List[Tuple[float, int]] = []
+        self.condition: threading.Condition = threading.Condition()
+        self.closing: bool = False
+        self.launched: int = 0
+        self.launch_failures: int = 0
+        self.alive: int = 0
+        self.max_alive: int = 0
+        self.writer: threading.Thread = threading.Thread(target=self._write_exports, name='simulated-exports', daemon=True)
+        self.writer.start()
+
+    def kill_all(self, names: List[str]) -> List[int]:
+        return []
+
+    def kill(self, pid: int) -> None:
+        with self.condition:
+            session: SimulatedSession or None = self.sessions.pop(pid, None)
+            if session is None:
+                return
+            session.killed = True
+            self.alive -= 1
+
+    def open_session(self, branch_info: BranchInfo, pids: List[int], restricted_pids: List[int]) -> int or None:
+        time.sleep(self.launch_seconds(self.random) * self.time_scale)
+        if self.random.random() < self.launch_error_rate:
+            self.launch_failures += 1
+            return None
+        pid: int = next(self.pid_counter)
+        ready_at: float = time.monotonic() + self.report_seconds(self.random, branch_info) * self.time_scale
+        with self.condition:
+            self.sessions[pid] = SimulatedSession(pid=pid, branch_info=branch_info, ready_at=ready_at,
+                                                  errored=self.random.random() < self.error_rate)
+            heapq.heappush(self.pending, (ready_at, pid))
+            self.launched += 1
+            self.alive += 1
+            self.max_alive = max(self.max_alive, self.alive)
+            self.condition.notify()
+        return pid
+
+    def _write_exports(self) -> None:
+        while True:
+            with self.condition:
+                while not self.closing and (not self.pending or self.pending[0][0] > time.monotonic()):
+                    self.condition.wait(timeout=self.pending[0][0] - time.monotonic() if self.pending else None)
+                if self.closing:
+                    return
+                _, pid = heapq.heappop(self.pending)
+                session: SimulatedSession or None = self.sessions.get(pid)
+            if session is None:
+                continue
+            b: BranchInfo = session.branch_info
+            os.makedirs(b.save_path, exist_ok=True)
+            with open(os.path.join(b.save_path, f'{pid}_{b.file_name}'), mode='wb') as f:
+                f.write(os.urandom(self.export_size))
+            session.written = True
+
+    def get_session_state(self, pid: int) -> str:
+        session: SimulatedSession or None = self.sessions.get(pid)
+        if session is None or session.killed:
+            return SessionState.GONE
+        if not session.written:
+            return SessionState.RUNNING
+        return SessionState.ERRORED if session.errored else SessionState.READY
+
+    def is_paused(self) -> bool:
+        return False
+
+    def validate_export(self, full_path: str) -> bool:
+        return True
+
+    def report(self) -> str:
+        return f'launched {self.launched}, launch failures {self.launch_failures}, max alive {self.max_alive}'
+
+    def close(self) -> None:
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.writer.join()
+
+
+class SimulatedQueueBackend(SimulatedBackend):
+    def __init__(self, queue: JobQueue, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.queue: JobQueue = queue
+
+    def poll(self) -> List[int]:
+        self.queue.beat()
+        return super().poll()
+
+
+def run_simulated_node(db_path: str, node: str, concurrency: int = 4, duration: float = .05,
+                       lease_seconds: float = 5., poll_interval: float = 1.) -> int:
+    completed: int = 0
+    with JobQueue(db_path=db_path, node=node, lease_seconds=lease_seconds) as queue:
+        backend: SimulatedQueueBackend = SimulatedQueueBackend(queue=queue, duration=lambda job: duration)
+
+        def on_finish(job: BranchInfo) -> None:
+            nonlocal completed
+            queue.complete(job_id=job.job_id)
+            completed += 1
+
+        scheduler: SessionScheduler = SessionScheduler(backend=backend, concurrency=concurrency,
+                                                       poll_interval=duration / 2, on_finish=on_finish)
+        while not queue.is_drained():
+            scheduler.run(jobs=queue.iter_leases())
+            time.sleep(poll_interval)
+    return completed
+
+
+def make_jobs(count: int, root: str, date_from: str = '2023-02-01', date_to: str = '2023-02-28',
+              seed: int = None) -> List[BranchInfo]:
+    rand: random.Random = random.Random(seed)
+    actions: List[str] = list(REPORT_SECONDS)
+    jobs: List[BranchInfo] = []
+    for i in range(count):
+        action: str = rand.choice(actions)
+        branch_info: BranchInfo = BranchInfo(branch=f'{i % 40 + 1:02}', account=str(100000 + i), account_name=f'account {i}',
+                                             date_from=date_from, date_to=date_to, action=action)
+        branch_info.file_name = f'{i}_{branch_info.file_name}'
+        branch_info.final_name = branch_info.file_name.replace('xls', 'xlsb')
+        branch_info.save_path = os.path.join(root, 'xls', action.lower(), branch_info.branch)
+        branch_info.final_save_path = os.path.join(root, 'final', action.lower(), branch_info.branch)
+        jobs.append(branch_info)
+    return jobs
+
+
+def run_strategy(jobs: List[BranchInfo], root: str, concurrency: int, order: str, time_scale: float,
+                 error_rate: float, launch_error_rate: float, seed: int = None, adaptive: bool = False) -> Dict:
+    os.makedirs(root, exist_ok=True)
+    history: DurationHistory = DurationHistory(path=os.path.join(root, 'durations.json'))
+    if order == 'longest-first':
+        for branch_info in jobs:
+            history.record(branch_info=branch_info, seconds=REPORT_SECONDS[branch_info.action])
+        jobs = history.order(jobs)
+    elif order == 'shuffled':
+        jobs = random.Random(seed).sample(jobs, len(jobs))
+
+    desktop: SimulatedDesktop = SimulatedDesktop(time_scale=time_scale, error_rate=error_rate,
+                                                 launch_error_rate=launch_error_rate, seed=seed)
+    policies: Dict[str, RetryPolicy] = {
+        FailureKind.COLVIR_ERROR: RetryPolicy(max_attempts=3, base_delay=60 * time_scale),
+        FailureKind.CONVERSION_ERROR: RetryPolicy(max_attempts=2, base_delay=30 * time_scale),
+        FailureKind.DELIVERY_ERROR: RetryPolicy(max_attempts=3, base_delay=5 * 60 * time_scale),
+        FailureKind.TIMEOUT: RetryPolicy(max_attempts=2, base_delay=5 * 60 * time_scale),
+    }
+    controller: ConcurrencyController = ConcurrencyController(
+        initial=concurrency,
+        min_concurrency=concurrency if not adaptive else max(concurrency // 4, 1),
+        max_concurrency=concurrency if not adaptive else concurrency * 2,
+        interval=30 * time_scale,
+        path=None,
+    )
+    with CompletionLedger(db_path=os.path.join(root, 'ledger.sqlite')) as ledger:
+        robot: Robot = Robot(
+            credentials=Credentials(usr='robot', psw='robot'),
+            process=Process(name='COLVIR', path='colvir.exe'),
+            notifier=NullNotifier(),
+            data=jobs,
+            ledger=ledger,
+            history=history,
+            journal=RunJournal(path=os.path.join(root, 'journal.jsonl')),
+            timer=Timer(),
+            desktop=desktop,
+            rejections=RejectionQueue(policies=policies),
+            export_root=os.path.join(root, 'xls'),
+            concurrency=concurrency,
+            session_timeout=2 * 60 * 60 * time_scale,
+            poll_interval=max(5 * time_scale, .01),
+            controller=controller,
+            delivery=DeliveryService(staging_root=os.path.join(root, 'staging'), backoff=5 * time_scale),
+        )
+        started: float = time.monotonic()
+        robot.run()
+        elapsed: float = time.monotonic() - started
+
+    delivered: int = sum(1 for b in jobs if robot.journal.get_stage(branch_info=b) == JobStage.DELIVERED)
+    return {
+        'concurrency': concurrency,
+        'adaptive': adaptive,
+        'final_concurrency': controller.adjustments[-1]['to'] if controller.adjustments else concurrency,
+        'order': order,
+        'jobs': len(jobs),
+        'delivered': delivered,
+        'failed': len(robot.rejections.failures()),
+        'elapsed': round(elapsed, 2),
+        'simulated_hours': round(elapsed / time_scale / 3600, 2),
+        'jobs_per_simulated_hour': round(delivered / (elapsed / time_scale / 3600), 1),
+        'max_alive': desktop.max_alive,
+    }
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Load-test Robot orchestration against simulated Colvir sessions')
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--concurrency', default='10,20,40')
+    parser.add_argument('--order', default='plan,longest-first')
+    parser.add_argument('--time-scale', type=float, default=.0005)
+    parser.add_argument('--error-rate', type=float, default=.02)
+    parser.add_argument('--launch-error-rate', type=float, default=.01)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--adaptive', action='store_true')
+    parser.add_argument('--output')
+    args: argparse.Namespace = parser.parse_args()
+
+    results: List[Dict] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for concurrency in (int(x) for x in args.concurrency.split(',')):
+            for order in args.order.split(','):
+                root: str = os.path.join(tmp, f'{concurrency}_{order}')
+                jobs: List[BranchInfo] = make_jobs(count=args.jobs, root=root, seed=args.seed)
+                result: Dict = run_strategy(jobs=jobs, root=root, concurrency=concurrency, order=order,
+                                            time_scale=args.time_scale, error_rate=args.error_rate,
+                                            launch_error_rate=args.launch_error_rate, seed=args.seed,
+                                            adaptive=args.adaptive)
+                results.append(result)
+
+    for result in results:
+        print('\t'.join(f'{key}={value}' for key, value in result.items()))
+    if args.output:
+        with open(file=args.output, mode='w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
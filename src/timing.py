@@ -0,0 +1,90 @@
+import json
+import math
+import time
+from typing import Dict, List, TextIO, Tuple
+from data_structures import BranchInfo, get_period_path
+
+
+class Span:
+    def __init__(self, timer: 'Timer', stage: str, branch_info: BranchInfo = None, **details) -> None:
+        self.timer: Timer = timer
+        self.stage: str = stage
+        self.branch_info: BranchInfo or None = branch_info
+        self.details: Dict = details
+        self.started: float or None = None
+
+    def __enter__(self) -> 'Span':
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type:
+            self.details['error'] = exc_type.__name__
+        self.timer.record(stage=self.stage, seconds=time.monotonic() - self.started, branch_info=self.branch_info, **self.details)
+
+
+class Timer:
+    def __init__(self, path: str = None) -> None:
+        self.path: str or None = path
+        self.file: TextIO or None = open(file=path, mode='a', encoding='utf-8') if path else None
+        self.samples: Dict[Tuple[str, str], List[float]] = {}
+
+    @staticmethod
+    def get_default_path(data: List[BranchInfo]) -> str:
+        return get_period_path(prefix='timings', data=data)
+
+    def __enter__(self) -> 'Timer':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def span(self, stage: str, branch_info: BranchInfo = None, **details) -> Span:
+        return Span(self, stage, branch_info, **details)
+
+    def record(self, stage: str, seconds: float, branch_info: BranchInfo = None, **details) -> None:
+        action: str = branch_info.action if branch_info and branch_info.action else '*'
+        self.samples.setdefault((action, stage), []).append(seconds)
+        if not self.file:
+            return
+        record: Dict = {'ts': time.time(), 'stage': stage, 'action': action, 'seconds': round(seconds, 3), **details}
+        if branch_info:
+            record['job_id'] = branch_info.job_id
+            record['branch'] = branch_info.branch
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    @staticmethod
+    def percentile(values: List[float], q: float) -> float:
+        values = sorted(values)
+        return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+    def summary(self) -> List[Dict]:
+        rows: List[Dict] = []
+        for (action, stage), values in sorted(self.samples.items()):
+            rows.append({
+                'action': action,
+                'stage': stage,
+                'count': len(values),
+                'p50': self.percentile(values=values, q=.5),
+                'p95': self.percentile(values=values, q=.95),
+                'max': max(values),
+            })
+        return rows
+
+    def write_summary(self) -> None:
+        if not self.file:
+            return
+        self.file.write(json.dumps({'ts': time.time(), 'summary': self.summary()}, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def report(self) -> str:
+        lines: List[str] = ['action\tstage\tcount\tp50\tp95\tmax']
+        for row in self.summary():
+            lines.append(f"{row['action']}\t{row['stage']}\t{row['count']}\t{row['p50']:.2f}\t{row['p95']:.2f}\t{row['max']:.2f}")
+        return '\n'.join(lines)
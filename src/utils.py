@@ -1,17 +1,21 @@
+import os
 import re
-from itertools import islice
 from time import sleep
-from typing import List, Dict
-import psutil
-import pywinauto
-import win32com.client as win32
-from psutil import Process
-from pywinauto.base_wrapper import ElementNotEnabled
+from typing import Callable, Dict, Iterator, List, Tuple
+from data_structures import get_osv_path
 from excel_converter import ExcelConverter
+from process_registry import registry
+
+try:
+    import pywinauto
+    import win32com.client as win32
+    from pywinauto.base_wrapper import ElementNotEnabled
+except ImportError:
+    pywinauto = win32 = ElementNotEnabled = None
 
 
 class BackendManager:
-    def __init__(self, app: pywinauto.Application, backend_name: str) -> None:
+    def __init__(self, app: 'pywinauto.Application', backend_name: str) -> None:
         self.app, self.backend_name = app, backend_name
 
     def __enter__(self) -> None:
@@ -29,7 +33,7 @@ class RobotStatus:
 
 class RobotStatusManager:
     def __init__(self) -> None:
-        self.status_file_path = r'C:\Users\robot.ad\Desktop\osv\robot_status.txt'
+        self.status_file_path = get_osv_path(name='robot_status.txt')
 
     def __enter__(self) -> None:
         with open(file=self.status_file_path, mode='w', encoding='utf-8') as f:
@@ -40,33 +44,107 @@ class RobotStatusManager:
             f.write(RobotStatus.IDLE if not exc_type else RobotStatus.ERRORED)
 
 
+class JournalReader:
+    pattern = re.compile(r'(Начало|Конец) записи \d+\.\d+\.\d+ \d+:\d+:\d+')
+
+    def __init__(self, file_path: str, columns: List[str] = None, contains: str = None,
+                 predicate: Callable[[Dict[str, str]], bool] = None) -> None:
+        self.file_path: str = file_path
+        self.columns: List[str] or None = columns
+        self.contains: str or None = contains
+        self.predicate: Callable[[Dict[str, str]], bool] or None = predicate
+        self.encoding: str = 'utf-8' if file_path.endswith('.txt') else 'utf-16'
+        self.newline: bytes = b'\n'
+        self.start: int = 0
+        self.offset: int = 0
+        self.header: List[Tuple[str, int]] or None = None
+        self.rows: int = 0
+        self.was_reset: bool = False
+
+    def reset(self) -> None:
+        self.offset = self.start
+        self.header = None
+        self.rows = 0
+
+    def detect_encoding(self, f) -> None:
+        if self.encoding != 'utf-16':
+            return
+        bom: bytes = f.read(2)
+        self.encoding = 'utf-16-be' if bom == b'\xfe\xff' else 'utf-16-le'
+        self.start = 2 if bom in (b'\xff\xfe', b'\xfe\xff') else 0
+        self.newline = '\n'.encode(self.encoding)
+        self.offset = max(self.offset, self.start)
+
+    def get_complete_end(self, chunk: bytes) -> int:
+        end: int = chunk.rfind(self.newline)
+        while end > 0 and end % len(self.newline):
+            end = chunk.rfind(self.newline, 0, end)
+        return end + len(self.newline) if end >= 0 else 0
+
+    def read(self) -> Iterator[Dict[str, str]]:
+        self.reset()
+        return self.tail(final=True)
+
+    def tail(self, final: bool = False) -> Iterator[Dict[str, str]]:
+        self.was_reset = os.path.getsize(self.file_path) < self.offset
+        if self.was_reset:
+            self.reset()
+        with open(file=self.file_path, mode='rb') as f:
+            if self.offset == 0:
+                self.detect_encoding(f=f)
+            f.seek(self.offset)
+            chunk: bytes = f.read()
+        end: int = len(chunk) if final else self.get_complete_end(chunk=chunk)
+        lines: List[str] = chunk[:end].decode(self.encoding).split('\n')
+        if lines and not lines[-1]:
+            lines.pop()
+        self.offset += end
+        return self.parse(lines=lines)
+
+    def parse(self, lines: List[str]) -> Iterator[Dict[str, str]]:
+        for line in lines:
+            if self.pattern.search(line):
+                continue
+            if self.header is None:
+                header: List[str] = [col.strip() for col in line.split('\t')]
+                self.header = [(col, i) for i, col in enumerate(header) if self.columns is None or col in self.columns]
+                continue
+            self.rows += 1
+            if self.contains and self.contains not in line:
+                continue
+            values: List[str] = line.split('\t')
+            row: Dict[str, str] = {col: values[i].strip() for col, i in self.header if i < len(values)}
+            if self.predicate and not self.predicate(row):
+                continue
+            yield row
+
+
 class Utils:
+    journal_readers: Dict[Tuple[str, str], JournalReader] = {}
+    reg_procedures: Dict[Tuple[str, str], bool] = {}
+
     def __init__(self) -> None:
         self.excel_converter: ExcelConverter = ExcelConverter()
 
     def convert(self, src_file: str, dst_file: str, file_type: str) -> None:
-        self.excel_converter.convert(src_file=src_file, dst_file=dst_file, file_type=file_type)
+        try:
+            self.excel_converter.convert(src_file=src_file, dst_file=dst_file, file_type=file_type)
+        except Exception as e:
+            print(f'Error Occured: {e}')
 
     @staticmethod
     def kill_process(pid) -> None:
-        p: Process = Process(pid)
-        p.terminate()
+        registry.terminate(pids=[pid], timeout=1.)
 
     @staticmethod
     def kill_all_processes(proc_name: str, restricted_pids: List[int] or None = None) -> None:
-        processes_to_kill: List[Process] = [Process(proc.pid) for proc in psutil.process_iter() if
-                                            proc_name in proc.name()]
-        for process in processes_to_kill:
-            try:
-                process.terminate()
-            except psutil.AccessDenied:
-                if restricted_pids:
-                    restricted_pids.append(process.pid)
-                continue
+        denied: List[int] = registry.kill_names(names=[proc_name])
+        if restricted_pids:
+            restricted_pids.extend(denied)
 
     @staticmethod
     def get_current_process_pid(proc_name: str) -> int or None:
-        return next((p.pid for p in psutil.process_iter() if proc_name in p.name()), None)
+        return next(iter(registry.find(name=proc_name)), None)
 
     @staticmethod
     def is_active(app) -> bool:
@@ -77,26 +155,26 @@ class Utils:
 
     @staticmethod
     def text_to_dicts(file_path: str) -> List[Dict[str, str]]:
-        pattern = re.compile(r'(Начало|Конец) записи \d+\.\d+\.\d+ \d+:\d+:\d+')
-        encoding = 'utf-8' if file_path.endswith('.txt') else 'utf-16'
-        with open(file=file_path, mode='r', encoding=encoding) as file:
-            rows = [[el.replace('\n', '') for el in line.split('\t')] for line in file if not pattern.search(line)]
-        header = [col.strip() for col in rows[0]]
-        data_rows = islice(rows, 1, None)
-        return [{col: val.strip() for col, val in zip(header, row)} for row in data_rows]
+        return list(JournalReader(file_path=file_path).read())
 
     @staticmethod
     def is_reg_procedure_ready(file_name: str, reg_num: str, delay: int = 5) -> bool:
-        data = Utils.text_to_dicts(file_name=file_name)
-        if not data:
-            sleep(delay)
-            return False
-
         user_name = 'Создатель базы данных'  # temporary
-
-        reg = next((row for row in data if row['Исполнитель'] == user_name and row['Операция'] == f'Регламентная процедура номер {reg_num}'), None)
-
-        if reg:
+        operation: str = f'Регламентная процедура номер {reg_num}'
+
+        key: Tuple[str, str] = (file_name, reg_num)
+        reader: JournalReader = Utils.journal_readers.get(key)
+        if reader is None:
+            reader = JournalReader(file_path=file_name, columns=['Исполнитель', 'Операция'], contains=operation,
+                                   predicate=lambda row: row.get('Исполнитель') == user_name and row.get('Операция') == operation)
+            Utils.journal_readers[key] = reader
+        rows: Iterator[Dict[str, str]] = reader.tail()
+        if reader.was_reset or key not in Utils.reg_procedures:
+            Utils.reg_procedures[key] = False
+        for _ in rows:
+            Utils.reg_procedures[key] = True
+
+        if not reader.rows or Utils.reg_procedures[key]:
             sleep(delay)
             return False
         return True
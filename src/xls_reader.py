@@ -0,0 +1,221 @@
+import struct
+from typing import BinaryIO, Dict, Iterator, List, Set, Tuple
+
+CFB_SIGNATURE: bytes = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+END_OF_CHAIN: int = 0xFFFFFFFE
+FREE_SECTOR: int = 0xFFFFFFFF
+
+BIFF8_VERSION: int = 0x0600
+BOF: int = 0x0809
+EOF: int = 0x000A
+BOUNDSHEET: int = 0x0085
+WINDOW1: int = 0x003D
+FONT: int = 0x0031
+XF: int = 0x00E0
+MULRK: int = 0x00BD
+MULBLANK: int = 0x00BE
+CELL_RECORDS: Tuple[int, ...] = (0x00FD, 0x0203, 0x027E, 0x0201, 0x0204, 0x0006, 0x0205)
+WORKBOOK_GLOBALS: int = 0x0005
+WORKSHEET: int = 0x0010
+DEFAULT_CELL_XF: int = 15
+
+
+def unpack(fmt: str, buffer: bytes, offset: int = 0) -> Tuple:
+    try:
+        return struct.unpack_from(fmt, buffer, offset)
+    except struct.error as e:
+        raise ValueError(f'truncated record: {e}')
+
+
+class CompoundFile:
+    def __init__(self, file: BinaryIO) -> None:
+        self.file: BinaryIO = file
+        header: bytes = file.read(512)
+        if len(header) < 512 or header[:8] != CFB_SIGNATURE:
+            raise ValueError('not an OLE2 compound file')
+
+        self.sector_size: int = 1 << unpack('<H', header, 0x1E)[0]
+        self.mini_sector_size: int = 1 << unpack('<H', header, 0x20)[0]
+        self.first_dir_sector: int = unpack('<I', header, 0x30)[0]
+        self.mini_cutoff: int = unpack('<I', header, 0x38)[0]
+        self.first_mini_fat_sector: int = unpack('<I', header, 0x3C)[0]
+        fat_sectors_number: int = unpack('<I', header, 0x2C)[0]
+        first_difat_sector, difat_sectors_number = unpack('<II', header, 0x44)
+
+        self.fat_sectors: List[int] = [s for s in unpack('<109I', header, 0x4C) if s != FREE_SECTOR]
+        difat_sector: int = first_difat_sector
+        per_sector: int = self.sector_size // 4
+        for _ in range(difat_sectors_number):
+            if difat_sector in (END_OF_CHAIN, FREE_SECTOR):
+                break
+            entries: Tuple = unpack(f'<{per_sector}I', self.read_sector(sector=difat_sector))
+            self.fat_sectors.extend(s for s in entries[:-1] if s != FREE_SECTOR)
+            difat_sector = entries[-1]
+        self.fat_sectors = self.fat_sectors[:fat_sectors_number]
+        self.fat_cache: Dict[int, Tuple] = {}
+
+    def read_sector(self, sector: int) -> bytes:
+        self.file.seek((sector + 1) * self.sector_size)
+        data: bytes = self.file.read(self.sector_size)
+        if len(data) < self.sector_size:
+            raise ValueError(f'sector {sector} is out of file bounds')
+        return data
+
+    def next_sector(self, sector: int) -> int:
+        per_sector: int = self.sector_size // 4
+        index: int = sector // per_sector
+        if index not in self.fat_cache:
+            if index >= len(self.fat_sectors):
+                raise ValueError(f'sector {sector} is not covered by the FAT')
+            self.fat_cache[index] = unpack(f'<{per_sector}I', self.read_sector(sector=self.fat_sectors[index]))
+        return self.fat_cache[index][sector % per_sector]
+
+    def iter_chain(self, start: int) -> Iterator[bytes]:
+        sector: int = start
+        visited: int = 0
+        while sector not in (END_OF_CHAIN, FREE_SECTOR):
+            yield self.read_sector(sector=sector)
+            sector = self.next_sector(sector=sector)
+            visited += 1
+            if visited > len(self.fat_sectors) * (self.sector_size // 4):
+                raise ValueError('cyclic sector chain')
+
+    def find_stream(self, names: Tuple[str, ...]) -> Tuple[int, int, Tuple[int, int]]:
+        root: Tuple[int, int] or None = None
+        for chunk in self.iter_chain(start=self.first_dir_sector):
+            for offset in range(0, len(chunk), 128):
+                name_size, entry_type = unpack('<HB', chunk, offset + 64)
+                start, size = unpack('<IQ', chunk, offset + 116)
+                if entry_type == 5:
+                    root = (start, size)
+                    continue
+                name: str = chunk[offset:offset + max(name_size - 2, 0)].decode('utf-16-le', errors='replace')
+                if entry_type == 2 and name in names:
+                    return start, size & 0xFFFFFFFF, root
+        raise ValueError(f'none of the streams {names} found')
+
+    def iter_stream(self, names: Tuple[str, ...]) -> Iterator[bytes]:
+        start, size, root = self.find_stream(names=names)
+        if size >= self.mini_cutoff:
+            yield from self.iter_sized(chunks=self.iter_chain(start=start), size=size)
+            return
+
+        if root is None:
+            raise ValueError('root entry is missing')
+        mini_stream: bytes = b''.join(self.iter_sized(chunks=self.iter_chain(start=root[0]), size=root[1]))
+        mini_fat: bytes = b''.join(self.iter_chain(start=self.first_mini_fat_sector))
+        chunks: List[bytes] = []
+        sector: int = start
+        while sector not in (END_OF_CHAIN, FREE_SECTOR) and len(chunks) * self.mini_sector_size < size:
+            chunks.append(mini_stream[sector * self.mini_sector_size:(sector + 1) * self.mini_sector_size])
+            sector = unpack('<I', mini_fat, sector * 4)[0]
+        yield from self.iter_sized(chunks=iter(chunks), size=size)
+
+    @staticmethod
+    def iter_sized(chunks: Iterator[bytes], size: int) -> Iterator[bytes]:
+        left: int = size
+        for chunk in chunks:
+            if left <= 0:
+                return
+            yield chunk[:left]
+            left -= len(chunk)
+
+
+class RecordReader:
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self.chunks: Iterator[bytes] = chunks
+        self.buffer: bytes = b''
+        self.position: int = 0
+
+    def read(self, size: int) -> bytes:
+        while len(self.buffer) < size:
+            chunk: bytes = next(self.chunks, b'')
+            if not chunk:
+                raise ValueError('unexpected end of workbook stream')
+            self.buffer += chunk
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        self.position += size
+        return data
+
+    def __iter__(self) -> Iterator[Tuple[int, int, bytes]]:
+        while True:
+            offset: int = self.position
+            record_type, size = unpack('<HH', self.read(4))
+            yield offset, record_type, self.read(size)
+
+
+class XlsReader:
+    def __init__(self, file_path: str) -> None:
+        self.file_path: str = file_path
+
+    def has_styled_cells(self, max_row: int = 50) -> bool:
+        with open(file=self.file_path, mode='rb') as file:
+            records: Iterator[Tuple[int, int, bytes]] = iter(RecordReader(
+                chunks=CompoundFile(file=file).iter_stream(names=('Workbook', 'Book'))
+            ))
+            sheet_offset, plain_xfs = self.read_globals(records=records)
+            for offset, record_type, data in records:
+                if offset < sheet_offset:
+                    continue
+                if record_type == BOF and offset == sheet_offset:
+                    if unpack('<H', data, 2)[0] != WORKSHEET:
+                        return False
+                    continue
+                if record_type == EOF:
+                    return False
+                for row, xf in self.iter_cell_styles(record_type=record_type, data=data):
+                    if row >= max_row:
+                        return False
+                    if xf not in plain_xfs:
+                        return True
+        return False
+
+    @staticmethod
+    def read_globals(records: Iterator[Tuple[int, int, bytes]]) -> Tuple[int, Set[int]]:
+        _, record_type, data = next(records)
+        if record_type != BOF or unpack('<HH', data) != (BIFF8_VERSION, WORKBOOK_GLOBALS):
+            raise ValueError('not a BIFF8 workbook')
+
+        active_tab: int = 0
+        sheet_offsets: List[int] = []
+        fonts: List[bytes] = []
+        xfs: List[bytes] = []
+        for _, record_type, data in records:
+            if record_type == WINDOW1:
+                active_tab = unpack('<H', data, 10)[0]
+            elif record_type == BOUNDSHEET:
+                sheet_offsets.append(unpack('<I', data)[0])
+            elif record_type == FONT:
+                fonts.append(data)
+            elif record_type == XF:
+                xfs.append(data)
+            elif record_type == EOF:
+                break
+        if not sheet_offsets:
+            raise ValueError('workbook has no sheets')
+
+        def signature(xf: bytes) -> Tuple:
+            font_index: int = unpack('<H', xf)[0]
+            font_index = font_index - 1 if font_index > 4 else font_index
+            font: bytes = fonts[font_index] if font_index < len(fonts) else b''
+            return font, xf[2:4], xf[6:9], xf[10:]
+
+        default_xf: int = DEFAULT_CELL_XF if DEFAULT_CELL_XF < len(xfs) else 0
+        default_signature: Tuple or None = signature(xf=xfs[default_xf]) if xfs else None
+        plain_xfs: Set[int] = {i for i, xf in enumerate(xfs) if signature(xf=xf) == default_signature}
+        sheet_offset: int = sheet_offsets[active_tab] if active_tab < len(sheet_offsets) else sheet_offsets[0]
+        return sheet_offset, plain_xfs
+
+    @staticmethod
+    def iter_cell_styles(record_type: int, data: bytes) -> Iterator[Tuple[int, int]]:
+        if record_type in CELL_RECORDS:
+            row, _, xf = unpack('<HHH', data)
+            yield row, xf
+        elif record_type == MULRK:
+            row: int = unpack('<H', data)[0]
+            for offset in range(4, len(data) - 2, 6):
+                yield row, unpack('<H', data, offset)[0]
+        elif record_type == MULBLANK:
+            row: int = unpack('<H', data)[0]
+            for offset in range(4, len(data) - 2, 2):
+                yield row, unpack('<H', data, offset)[0]
@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+from pyxlsb import open_workbook
+
+
+class XlsbProbe:
+    placeholder_rows: int = 20
+    placeholder_max_kb: float = 20
+
+    @staticmethod
+    def count_rows(file_path: str, limit: int or None = None) -> int:
+        with open_workbook(file_path) as workbook:
+            with workbook.get_sheet(1) as sheet:
+                if sheet.dimension is None:
+                    return 0
+                counter: int = 0
+                for row in sheet.rows(sparse=True):
+                    if all(cell.v is None or cell.v == '' for cell in row):
+                        continue
+                    counter += 1
+                    if limit is not None and counter >= limit:
+                        break
+                return counter
+
+    @staticmethod
+    def count_data_rows(file_path: str, limit: int or None = None) -> int:
+        rows: int = XlsbProbe.count_rows(file_path=file_path, limit=limit + 1 if limit is not None else None)
+        return max(rows - 1, 0)
+
+    @staticmethod
+    def count_many(file_paths: Iterable[str], limit: int or None = None, workers: int = 8) -> Dict[str, int]:
+        file_paths: List[str] = list(file_paths)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            counts = executor.map(lambda path: XlsbProbe.count_data_rows(file_path=path, limit=limit), file_paths)
+            return dict(zip(file_paths, counts))
+
+    @staticmethod
+    def is_small(size: int) -> bool:
+        return round(size / 1024, 2) <= XlsbProbe.placeholder_max_kb
+
+    @staticmethod
+    def is_placeholder(size: int, row_count: int) -> bool:
+        return XlsbProbe.is_small(size=size) and row_count == XlsbProbe.placeholder_rows
+
+    @staticmethod
+    def probe_placeholder_rows(file_path: str) -> int or None:
+        if not XlsbProbe.is_small(size=os.path.getsize(file_path)):
+            return None
+        return XlsbProbe.count_data_rows(file_path=file_path, limit=XlsbProbe.placeholder_rows + 1)
@@ -0,0 +1,43 @@
+import os
+import sys
+from typing import List, Tuple
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from concurrency import ConcurrencyController
+from data_structures import BranchInfo, Credentials, Process
+from delivery import DeliveryService
+from journal import RunJournal
+from ledger import CompletionLedger
+from robot import Robot
+from simulation import NullNotifier, SimulatedDesktop, make_jobs
+from timing import Timer
+
+
+@pytest.fixture
+def robot(tmp_path):
+    root: str = str(tmp_path)
+    jobs: List[BranchInfo] = make_jobs(count=1, root=root, seed=1)
+    desktop: SimulatedDesktop = SimulatedDesktop(seed=1)
+    with CompletionLedger(db_path=os.path.join(root, 'ledger.sqlite')) as ledger:
+        robot: Robot = Robot(
+            credentials=Credentials(usr='robot', psw='robot'),
+            process=Process(name='COLVIR', path='colvir.exe'),
+            notifier=NullNotifier(),
+            data=jobs,
+            ledger=ledger,
+            journal=RunJournal(path=os.path.join(root, 'journal.jsonl')),
+            timer=Timer(),
+            desktop=desktop,
+            export_root=os.path.join(root, 'xls'),
+            controller=ConcurrencyController(path=None),
+            delivery=DeliveryService(staging_root=os.path.join(root, 'staging')),
+        )
+        robot.calls: List[Tuple[str, str]] = []
+        robot.submit_conversion = lambda branch_info, full_xls_path: robot.calls.append(('convert', full_xls_path))
+        robot.submit_delivery = lambda branch_info, staged_xlsb_path: robot.calls.append(('deliver', staged_xlsb_path))
+        robot.deliver = lambda branch_info, full_xlsb_path: robot.calls.append(('record', full_xlsb_path))
+        yield robot
+        robot.journal.close()
+        desktop.close()
@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+import pytest
+import requests
+from bot_notification import MAX_MESSAGE_LENGTH, TelegramNotifier
+from data_structures import BranchInfo
+from retry_queue import FailureKind, RejectionQueue, RetryPolicy
+
+
+class FakeTelegram(BaseHTTPRequestHandler):
+    messages: List[str] = []
+    throttle: int = 0
+
+    def do_POST(self) -> None:
+        body: bytes = self.rfile.read(int(self.headers['Content-Length']))
+        if FakeTelegram.throttle:
+            FakeTelegram.throttle -= 1
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        params: Dict[str, List[str]] = parse_qs(urlparse(self.path).query)
+        text: str = json.loads(body)['text']
+        if len(text) > MAX_MESSAGE_LENGTH or (params.get('parse_mode') == ['Markdown'] and text.count('_') % 2):
+            self.send_response(400)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        FakeTelegram.messages.append(text)
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def api_url():
+    FakeTelegram.messages = []
+    FakeTelegram.throttle = 0
+    server: ThreadingHTTPServer = ThreadingHTTPServer(('127.0.0.1', 0), FakeTelegram)
+    thread: threading.Thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/sendMessage'
+    server.shutdown()
+    server.server_close()
+
+
+def test_messages_are_delivered_in_order(api_url):
+    with requests.Session() as session, TelegramNotifier(chat_id='1', session=session, token='t', api_url=api_url,
+                                                         rate=100., burst=10) as notifier:
+        assert notifier.send_notification(message='started')
+        assert notifier.send_notification(message='Completed')
+    assert FakeTelegram.messages == ['started', 'Completed']
+    assert notifier.sent == 2 and notifier.failed == 0
+
+
+def test_throttled_requests_are_retried(api_url):
+    FakeTelegram.throttle = 2
+    with requests.Session() as session, TelegramNotifier(chat_id='1', session=session, token='t', api_url=api_url,
+                                                         rate=100., burst=10) as notifier:
+        notifier.send_notification(message='hello')
+    assert FakeTelegram.messages == ['hello']
+    assert notifier.failed == 0
+
+
+def test_progress_messages_are_coalesced(api_url):
+    with requests.Session() as session, TelegramNotifier(chat_id='1', session=session, token='t', api_url=api_url,
+                                                         rate=100., burst=10, coalesce_window=.2) as notifier:
+        for i in range(1, 51):
+            notifier.send_notification(message=f'{i}/50')
+        time.sleep(.5)
+        notifier.send_notification(message='Completed')
+    assert FakeTelegram.messages == ['50/50', 'Completed']
+    assert notifier.coalesced == 49
+
+
+def test_send_does_not_block_when_queue_is_full(api_url):
+    with requests.Session() as session:
+        notifier: TelegramNotifier = TelegramNotifier(chat_id='1', session=session, token='t', api_url=api_url,
+                                                      rate=5., burst=1, queue_size=2)
+        started: float = time.monotonic()
+        results: List[bool] = [notifier.send_notification(message=f'message {i}') for i in range(20)]
+        assert time.monotonic() - started < .5
+        assert not all(results)
+        assert notifier.dropped == results.count(False)
+        notifier.close()
+        assert notifier.sent + notifier.dropped == 20
+
+
+def test_long_messages_are_split_on_lines():
+    message: str = '\n'.join(f'line {i}' for i in range(2000))
+    chunks: List[str] = TelegramNotifier.split_message(message=message, max_length=100)
+    assert ''.join(chunks) == message
+    assert all(len(chunk) <= 100 and (chunk.endswith('\n') or chunk is chunks[-1]) for chunk in chunks)
+    assert TelegramNotifier.split_message(message='x' * 250, max_length=100) == ['x' * 100, 'x' * 100, 'x' * 50]
+    assert TelegramNotifier.split_message(message='') == ['']
+
+
+def test_rejection_report_with_underscores_is_delivered(api_url):
+    rejections: RejectionQueue = RejectionQueue(policies={FailureKind.CONVERSION_ERROR: RetryPolicy(max_attempts=1, base_delay=0)})
+    for i in range(200):
+        branch_info: BranchInfo = BranchInfo(branch=f'00_{i}', account=f'KZ_{i}', date_from='2023-01-01', date_to='2023-01-31',
+                                             action='S_CLI_003')
+        rejections.reject(branch_info=branch_info, kind=FailureKind.CONVERSION_ERROR, error=f'could not open C:\\xls\\report_{i}_.xls')
+    report: str = rejections.report()
+    assert len(report) > MAX_MESSAGE_LENGTH and all(line.count('_') % 2 for line in report.splitlines()[1:])
+    with requests.Session() as session, TelegramNotifier(chat_id='1', session=session, token='t', api_url=api_url,
+                                                         rate=100., burst=10) as notifier:
+        notifier.send_notification(message=report)
+    assert notifier.failed == 0 and len(FakeTelegram.messages) > 1
+    assert ''.join(FakeTelegram.messages) == report
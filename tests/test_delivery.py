@@ -0,0 +1,86 @@
+import glob
+import hashlib
+import os
+import subprocess
+import sys
+import textwrap
+from typing import List
+from delivery import DeliveryResult, DeliveryService
+
+
+def write(path: str, data: bytes) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(file=path, mode='wb') as f:
+        f.write(data)
+    return path
+
+
+def read(path: str) -> bytes:
+    with open(file=path, mode='rb') as f:
+        return f.read()
+
+
+def deliver(service: DeliveryService, src_file: str, dst_file: str) -> DeliveryResult:
+    with service:
+        service.submit(src_file=src_file, dst_file=dst_file)
+        service.join()
+        results: List[DeliveryResult] = service.drain()
+    assert len(results) == 1
+    return results[0]
+
+
+def test_new_file_is_delivered(tmp_path):
+    data: bytes = os.urandom(3 * 1024 + 7)
+    src_file: str = write(path=str(tmp_path / 'staging' / 'a.xlsb'), data=data)
+    dst_file: str = str(tmp_path / 'final' / 'branch' / 'a.xlsb')
+    result: DeliveryResult = deliver(service=DeliveryService(staging_root=str(tmp_path / 'staging'), chunk_size=1024),
+                                     src_file=src_file, dst_file=dst_file)
+    assert result.success and result.size == len(data) and result.checksum == hashlib.sha256(data).hexdigest()
+    assert read(dst_file) == data
+    assert not os.path.exists(src_file)
+
+
+def test_existing_target_is_overwritten(tmp_path):
+    src_file: str = write(path=str(tmp_path / 'staging' / 'a.xlsb'), data=b'new report')
+    dst_file: str = write(path=str(tmp_path / 'final' / 'a.xlsb'), data=b'old report, longer than the new one')
+    result: DeliveryResult = deliver(service=DeliveryService(staging_root=str(tmp_path / 'staging')),
+                                     src_file=src_file, dst_file=dst_file)
+    assert result.success
+    assert read(dst_file) == b'new report'
+    assert glob.glob(f'{dst_file}.*.part') == []
+
+
+def test_checksum_mismatch_leaves_target_untouched(tmp_path):
+    src_file: str = write(path=str(tmp_path / 'staging' / 'a.xlsb'), data=b'new report')
+    dst_file: str = write(path=str(tmp_path / 'final' / 'a.xlsb'), data=b'old report')
+    service: DeliveryService = DeliveryService(staging_root=str(tmp_path / 'staging'), retries=1, backoff=0.)
+    service.get_checksum = lambda file_path: 'corrupted'
+    result: DeliveryResult = deliver(service=service, src_file=src_file, dst_file=dst_file)
+    assert not result.success and 'checksum mismatch' in result.error
+    assert result.job.attempts == 2 and service.metrics()['retried'] == 1
+    assert read(dst_file) == b'old report'
+    assert read(src_file) == b'new report'
+    assert glob.glob(f'{dst_file}.*.part') == []
+
+
+def test_crash_before_replace_is_resumed(tmp_path):
+    src_file: str = write(path=str(tmp_path / 'staging' / 'a.xlsb'), data=b'new report')
+    dst_file: str = write(path=str(tmp_path / 'final' / 'a.xlsb'), data=b'old report')
+    script: str = textwrap.dedent(f'''
+        import os
+        import sys
+        sys.path.insert(0, {os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')!r})
+        from delivery import DeliveryService
+        os.replace = lambda src, dst: os._exit(3)
+        DeliveryService(staging_root={str(tmp_path / 'staging')!r}).copy(src_file={src_file!r}, dst_file={dst_file!r})
+    ''')
+    assert subprocess.run([sys.executable, '-c', script]).returncode == 3
+    assert read(dst_file) == b'old report'
+    assert read(src_file) == b'new report'
+    assert len(glob.glob(f'{dst_file}.*.part')) == 1
+
+    result: DeliveryResult = deliver(service=DeliveryService(staging_root=str(tmp_path / 'staging')),
+                                     src_file=src_file, dst_file=dst_file)
+    assert result.success and result.job.attempts == 1
+    assert read(dst_file) == b'new report'
+    assert not os.path.exists(src_file)
@@ -0,0 +1,73 @@
+import os
+from typing import List
+from export_scanner import ExportScanner
+
+
+def write(path: str, data: bytes = b'data') -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(file=path, mode='wb') as f:
+        f.write(data)
+    return path
+
+
+def names(scanner: ExportScanner) -> List[str]:
+    return sorted(file_info.name for file_info in scanner.poll())
+
+
+def test_polling_finds_new_and_changed_exports(tmp_path):
+    root: str = str(tmp_path)
+    write(os.path.join(root, 'z_160_gl_020', '01', '123_a.xls'))
+    write(os.path.join(root, 'z_160_gl_020', '01', 'a.xlsx'))
+    write(os.path.join(root, 'z_160_gl_020', '01', '123_a.xls_copy.xls'))
+    scanner: ExportScanner = ExportScanner(root=root, use_notifications=False)
+    assert scanner.change_handle is None
+
+    assert names(scanner) == ['123_a.xls']
+    assert names(scanner) == []
+
+    write(os.path.join(root, 'z_160_gl_020', '01', '123_a.xls'), data=b'more data')
+    write(os.path.join(root, 's_cli_003', '02', '456_b.xls'))
+    assert names(scanner) == ['123_a.xls', '456_b.xls']
+    scanner.close()
+
+
+def test_deferred_done_and_rejected_files(tmp_path):
+    root: str = str(tmp_path)
+    write(os.path.join(root, '1_a.xls'))
+    write(os.path.join(root, '2_b.xls'))
+    scanner: ExportScanner = ExportScanner(root=root, use_notifications=False)
+
+    first, second = sorted(scanner.poll(), key=lambda file_info: file_info.name)
+    scanner.defer(file_info=first)
+    scanner.mark_rejected(file_info=second)
+    assert names(scanner) == ['1_a.xls']
+
+    scanner.mark_done(file_info=first)
+    scanner.defer(file_info=first)
+    write(os.path.join(root, '2_b.xls'), data=b'rewritten')
+    assert names(scanner) == []
+
+
+def test_file_created_within_directory_mtime_tick_is_found(tmp_path):
+    root: str = str(tmp_path)
+    folder: str = os.path.join(root, 'xls')
+    os.makedirs(folder)
+    scanner: ExportScanner = ExportScanner(root=root, use_notifications=False)
+    assert names(scanner) == []
+    listed_mtime: int = os.stat(folder).st_mtime_ns
+
+    write(os.path.join(folder, '123_a.xls'))
+    os.utime(folder, ns=(listed_mtime, listed_mtime))
+    assert names(scanner) == ['123_a.xls']
+
+
+def test_removed_directories_are_forgotten(tmp_path):
+    root: str = str(tmp_path)
+    path: str = write(os.path.join(root, 'xls', '1_a.xls'))
+    scanner: ExportScanner = ExportScanner(root=root, use_notifications=False)
+    assert names(scanner) == ['1_a.xls']
+
+    os.unlink(path)
+    os.rmdir(os.path.dirname(path))
+    assert names(scanner) == []
+    assert path not in scanner.files
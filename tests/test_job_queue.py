@@ -0,0 +1,78 @@
+import multiprocessing
+import time
+import os
+from typing import List
+from data_structures import BranchInfo
+from job_queue import JobQueue, JobState
+from simulation import make_jobs, run_simulated_node
+
+
+def make_queue(tmp_path, count: int) -> str:
+    db_path: str = os.path.join(tmp_path, 'queue.sqlite')
+    jobs: List[BranchInfo] = make_jobs(count=count, root=str(tmp_path), seed=1)
+    with JobQueue(db_path=db_path, node='planner') as queue:
+        assert queue.enqueue(data=jobs) == count
+        assert queue.enqueue(data=jobs) == 0
+    return db_path
+
+
+def test_nodes_drain_queue_and_take_over_dead_and_stuck_leases(tmp_path):
+    db_path: str = make_queue(tmp_path=tmp_path, count=400)
+
+    with JobQueue(db_path=db_path, node='dead', lease_seconds=1.) as dead:
+        assert len(dead.lease(limit=5)) == 5
+    stuck: JobQueue = JobQueue(db_path=db_path, node='stuck', lease_seconds=1.)
+    assert len(stuck.lease(limit=5)) == 5
+
+    with multiprocessing.get_context('spawn').Pool(processes=3) as pool:
+        completed: List[int] = pool.starmap(run_simulated_node, [(db_path, f'node-{i}', 4, .01, 5., .2) for i in range(3)])
+
+    with JobQueue(db_path=db_path) as queue:
+        assert queue.counts() == {JobState.DONE: 400}
+        owners = dict(queue.connection.execute('SELECT owner, COUNT(*) FROM jobs GROUP BY owner').fetchall())
+    assert sum(completed) == 400
+    assert 'dead' not in owners and 'stuck' not in owners
+    stuck.close()
+
+
+def test_beat_renews_own_leases_at_most_once_per_interval(tmp_path):
+    db_path: str = make_queue(tmp_path=tmp_path, count=4)
+    with JobQueue(db_path=db_path, node='a', lease_seconds=60.) as a, JobQueue(db_path=db_path, node='b') as b:
+        a.lease(limit=2)
+        b.lease(limit=1)
+        assert a.heartbeat() == 2
+
+        def expires() -> dict:
+            return dict(a.connection.execute('SELECT job_id, lease_expires FROM jobs WHERE owner IS NOT NULL').fetchall())
+
+        a.beat()
+        first: dict = expires()
+        a.beat()
+        assert expires() == first
+        assert len(b.lease(limit=4)) == 1
+
+
+def test_restarted_node_does_not_renew_leases_of_its_crashed_run(tmp_path):
+    db_path: str = make_queue(tmp_path=tmp_path, count=3)
+
+    crashed: JobQueue = JobQueue(db_path=db_path, node='robot-7', lease_seconds=.5)
+    orphan: BranchInfo = crashed.lease(limit=1)[0]
+    crashed.connection.close()
+
+    with JobQueue(db_path=db_path, node='robot-7', lease_seconds=.5) as restarted:
+        leased: List[BranchInfo] = restarted.lease(limit=2)
+        assert orphan.job_id not in {b.job_id for b in leased}
+        assert restarted.heartbeat() == 2
+
+        deadline: float = time.monotonic() + 5
+        while orphan.job_id not in {b.job_id for b in leased} and time.monotonic() < deadline:
+            time.sleep(.1)
+            restarted.heartbeat()
+            leased.extend(restarted.lease(limit=1))
+        for branch_info in leased:
+            restarted.complete(job_id=branch_info.job_id)
+
+        assert orphan.job_id in {b.job_id for b in leased}
+        assert restarted.counts() == {JobState.DONE: 3}
+        assert restarted.is_drained()
+        assert not restarted.leased
@@ -0,0 +1,82 @@
+import os
+from typing import Dict, List
+import pytest
+from utils import JournalReader
+
+HEADER: str = 'Дата\tПроцедура\tСтатус\n'
+
+
+def append(path: str, data: bytes) -> None:
+    with open(file=path, mode='ab') as f:
+        f.write(data)
+
+
+def rows(reader: JournalReader, final: bool = False) -> List[Dict[str, str]]:
+    return list(reader.tail(final=final))
+
+
+@pytest.mark.parametrize('name, encoding, bom', [
+    ('journal.txt', 'utf-8', b''),
+    ('journal.log', 'utf-16-le', b'\xff\xfe'),
+    ('journal.log', 'utf-16-be', b'\xfe\xff'),
+])
+def test_torn_last_line_is_read_once_complete(tmp_path, name, encoding, bom):
+    path: str = os.path.join(str(tmp_path), name)
+    line: bytes = 'Начало записи 01.02.2023 10:00:00\n'.encode(encoding) + HEADER.encode(encoding)
+    line += '01.02.2023\tZ_160_GL_020\tГотово\n'.encode(encoding)
+    torn: bytes = '02.02.2023\tS_CLI_003\tГот'.encode(encoding)
+    append(path=path, data=bom + line + torn)
+    reader: JournalReader = JournalReader(file_path=path)
+
+    assert rows(reader) == [{'Дата': '01.02.2023', 'Процедура': 'Z_160_GL_020', 'Статус': 'Готово'}]
+    assert rows(reader) == []
+    append(path=path, data='ово\n'.encode(encoding))
+    assert rows(reader) == [{'Дата': '02.02.2023', 'Процедура': 'S_CLI_003', 'Статус': 'Готово'}]
+    assert reader.rows == 2 and not reader.was_reset
+
+
+def test_final_read_includes_the_torn_line(tmp_path):
+    path: str = os.path.join(str(tmp_path), 'journal.txt')
+    append(path=path, data=(HEADER + '01.02.2023\tS_CLI_003\tГотово').encode('utf-8'))
+    reader: JournalReader = JournalReader(file_path=path, columns=['Процедура'])
+    assert rows(reader) == []
+    assert list(reader.read()) == [{'Процедура': 'S_CLI_003'}]
+
+
+@pytest.mark.parametrize('name, encoding, bom', [('journal.txt', 'utf-8', b''), ('journal.log', 'utf-16-le', b'\xff\xfe')])
+def test_truncated_or_rotated_journal_is_read_from_start(tmp_path, name, encoding, bom):
+    path: str = os.path.join(str(tmp_path), name)
+    append(path=path, data=bom + (HEADER + ''.join(f'0{i}.02.2023\tZ_160_GL_020\tГотово\n' for i in range(1, 6))).encode(encoding))
+    reader: JournalReader = JournalReader(file_path=path, columns=['Дата'])
+    assert len(rows(reader)) == 5
+
+    os.unlink(path)
+    append(path=path, data=bom + (HEADER + '10.02.2023\tS_CLI_004\tГотово\n').encode(encoding))
+    assert rows(reader) == [{'Дата': '10.02.2023'}]
+    assert reader.was_reset and reader.rows == 1
+
+    append(path=path, data='11.02.2023\tS_CLI_004\tГотово\n'.encode(encoding))
+    assert rows(reader) == [{'Дата': '11.02.2023'}]
+    assert not reader.was_reset and reader.rows == 2
+
+
+def test_utf16_newline_bytes_inside_characters_are_not_line_ends(tmp_path):
+    path: str = os.path.join(str(tmp_path), 'journal.log')
+    value: str = 'ਊĀ'
+    assert '\n'.encode('utf-16-le') in value.encode('utf-16-le')
+    append(path=path, data=b'\xff\xfe' + (HEADER + f'01.02.2023\t{value}').encode('utf-16-le'))
+    reader: JournalReader = JournalReader(file_path=path, contains=value)
+    assert rows(reader) == []
+    append(path=path, data='\tГотово\n'.encode('utf-16-le'))
+    assert rows(reader) == [{'Дата': '01.02.2023', 'Процедура': value, 'Статус': 'Готово'}]
+
+
+def test_multibyte_character_split_across_writes(tmp_path):
+    path: str = os.path.join(str(tmp_path), 'journal.txt')
+    data: bytes = (HEADER + '01.02.2023\tS_CLI_013\tГотово\n').encode('utf-8')
+    reader: JournalReader = JournalReader(file_path=path, predicate=lambda row: row['Статус'] == 'Готово')
+    split: int = data.index('Готово'.encode('utf-8')) + 1
+    append(path=path, data=data[:split])
+    assert rows(reader) == []
+    append(path=path, data=data[split:])
+    assert rows(reader) == [{'Дата': '01.02.2023', 'Процедура': 'S_CLI_013', 'Статус': 'Готово'}]
@@ -0,0 +1,94 @@
+import os
+from typing import Dict, List, Tuple
+import pytest
+from data_structures import BranchInfo
+from journal import JobStage
+from retry_queue import FailureKind
+from robot import Robot
+
+
+def write(path: str, data: bytes = b'data') -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(file=path, mode='wb') as f:
+        f.write(data)
+    return path
+
+
+def resume(robot: Robot, stage: str or None, xls: bool = False, staged: bool = False, final: bool = False,
+           **details) -> Tuple[List[BranchInfo], List[Tuple[str, str]], Dict[str, str]]:
+    branch_info: BranchInfo = robot.data[0]
+    paths: Dict[str, str] = {
+        'xls': os.path.join(branch_info.save_path, f'10000_{branch_info.file_name}'),
+        'staged': robot.delivery.get_staging_path(name=f'{branch_info.job_id}_{branch_info.final_name}'),
+        'final': os.path.join(branch_info.final_save_path, branch_info.final_name),
+    }
+    for name, exists in (('xls', xls), ('staged', staged), ('final', final)):
+        if exists:
+            write(paths[name])
+    if xls:
+        details['xls_path'] = paths['xls']
+    if staged:
+        details['xlsb_path'] = paths['staged']
+    if stage:
+        robot.journal.record(branch_info=branch_info, stage=stage, **details)
+    return robot.resume(data=[branch_info]), robot.calls, paths
+
+
+@pytest.mark.parametrize('stage', [None, JobStage.PLANNED, JobStage.SESSION_OPENED])
+def test_jobs_without_exports_are_left_for_colvir(robot, stage):
+    left, calls, _ = resume(robot=robot, stage=stage)
+    assert left == robot.data and calls == []
+
+
+def test_delivered_job_is_skipped(robot):
+    left, calls, _ = resume(robot=robot, stage=JobStage.DELIVERED)
+    assert left == [] and calls == []
+
+
+@pytest.mark.parametrize('stage', [JobStage.EXPORTED, JobStage.VALIDATED])
+def test_existing_export_is_converted(robot, stage):
+    left, calls, paths = resume(robot=robot, stage=stage, xls=True)
+    assert left == [] and calls == [('convert', paths['xls'])]
+    assert robot.journal.get_stage(branch_info=robot.data[0]) == JobStage.VALIDATED
+
+
+def test_invalid_export_is_left_for_colvir(robot):
+    robot.desktop.validate_export = lambda full_path: False
+    left, calls, _ = resume(robot=robot, stage=JobStage.EXPORTED, xls=True)
+    assert left == robot.data and calls == []
+
+
+@pytest.mark.parametrize('stage', [JobStage.EXPORTED, JobStage.VALIDATED])
+def test_missing_export_is_left_for_colvir(robot, stage):
+    left, calls, paths = resume(robot=robot, stage=stage, xls_path='missing.xls')
+    assert left == robot.data and calls == []
+
+
+def test_converted_job_with_final_file_is_recorded(robot):
+    left, calls, paths = resume(robot=robot, stage=JobStage.CONVERTED, final=True)
+    assert left == [] and calls == [('record', paths['final'])]
+
+
+def test_converted_job_with_staged_file_is_delivered(robot):
+    left, calls, paths = resume(robot=robot, stage=JobStage.CONVERTED, staged=True)
+    assert left == [] and calls == [('deliver', paths['staged'])]
+
+
+def test_converted_job_without_files_is_left_for_colvir(robot):
+    left, calls, _ = resume(robot=robot, stage=JobStage.CONVERTED, xlsb_path='missing.xlsb')
+    assert left == robot.data and calls == []
+
+
+def test_conversion_error_with_export_is_converted_again(robot):
+    left, calls, paths = resume(robot=robot, stage=JobStage.REJECTED, xls=True, kind=FailureKind.CONVERSION_ERROR)
+    assert left == [] and calls == [('convert', paths['xls'])]
+
+
+def test_delivery_error_with_staged_file_is_delivered_again(robot):
+    left, calls, paths = resume(robot=robot, stage=JobStage.REJECTED, staged=True, kind=FailureKind.DELIVERY_ERROR)
+    assert left == [] and calls == [('deliver', paths['staged'])]
+
+
+def test_colvir_error_without_export_is_left_for_colvir(robot):
+    left, calls, _ = resume(robot=robot, stage=JobStage.REJECTED, kind=FailureKind.COLVIR_ERROR)
+    assert left == robot.data and calls == []
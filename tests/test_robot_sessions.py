@@ -0,0 +1,65 @@
+import os
+from data_structures import BranchInfo
+from desktop import SessionState
+from journal import JobStage
+from robot import Robot
+
+
+def write(path: str, data: bytes = b'data') -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(file=path, mode='wb') as f:
+        f.write(data)
+    return path
+
+
+def export(robot: Robot, pid: int, data: bytes = b'data') -> str:
+    branch_info: BranchInfo = robot.data[0]
+    return write(path=os.path.join(branch_info.save_path, f'{pid}_{branch_info.file_name}'), data=data)
+
+
+def test_export_of_unknown_gone_session_is_picked_up(robot):
+    path: str = export(robot=robot, pid=999)
+    assert robot.desktop.get_session_state(pid=999) == SessionState.GONE
+    assert robot.close_sessions() == []
+    assert robot.calls == [('convert', path)]
+    assert robot.journal.get_stage(branch_info=robot.data[0]) == JobStage.VALIDATED
+    assert path in robot.scanner.done and not robot.scanner.deferred
+
+
+def test_export_of_finished_job_is_not_converted_again(robot):
+    robot.journal.record(branch_info=robot.data[0], stage=JobStage.DELIVERED)
+    path: str = export(robot=robot, pid=999)
+    assert robot.close_sessions() == []
+    assert robot.calls == []
+    assert path in robot.scanner.done and not robot.scanner.deferred
+
+
+def test_empty_export_of_gone_session_is_rejected(robot):
+    path: str = export(robot=robot, pid=999, data=b'')
+    assert robot.close_sessions() == []
+    assert robot.calls == []
+    assert path in robot.scanner.rejected and not robot.scanner.deferred
+
+
+def test_gone_session_of_this_run_is_picked_up_after_grace(robot):
+    robot.pids.append(999)
+    robot.register_export(pid=999, branch_info=robot.data[0])
+    path: str = export(robot=robot, pid=999)
+    assert robot.close_sessions() == []
+    assert robot.calls == [] and path in robot.scanner.deferred
+
+    robot.gone_grace = 0.
+    assert robot.close_sessions() == [999]
+    assert robot.calls == [('convert', path)] and robot.pids == []
+    assert path in robot.scanner.done and not robot.scanner.deferred
+
+
+def test_empty_export_of_gone_session_of_this_run_is_rejected(robot):
+    robot.gone_grace = 0.
+    robot.pids.append(999)
+    robot.register_export(pid=999, branch_info=robot.data[0])
+    path: str = export(robot=robot, pid=999, data=b'')
+    assert robot.close_sessions() == [999]
+    assert robot.calls == [] and robot.pids == []
+    assert robot.rejections.is_rejected(branch_info=robot.data[0])
+    assert path in robot.scanner.rejected and not robot.scanner.deferred
@@ -0,0 +1,84 @@
+import os
+import time
+from typing import Dict, List
+from data_structures import BranchInfo
+from desktop import SessionState
+from scheduler import SessionScheduler, SimulatedBackend
+from simulation import SimulatedDesktop, make_jobs, run_strategy
+
+
+class PausedBackend(SimulatedBackend):
+    def __init__(self, paused_for: float, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.resume_at: float = time.monotonic() + paused_for
+        self.polls_while_paused: int = 0
+
+    def paused(self) -> bool:
+        return time.monotonic() < self.resume_at
+
+    def poll(self) -> List[int]:
+        if self.paused():
+            self.polls_while_paused += 1
+        return super().poll()
+
+
+def test_scheduler_respects_concurrency():
+    backend: SimulatedBackend = SimulatedBackend(duration=lambda job: .01)
+    finished: List[int] = []
+    scheduler: SessionScheduler = SessionScheduler(backend=backend, concurrency=4, poll_interval=.005, on_finish=finished.append)
+    scheduler.run(jobs=range(40))
+
+    assert sorted(backend.completed) == list(range(40))
+    assert sorted(finished) == list(range(40))
+    assert backend.max_in_flight == 4
+    assert scheduler.started == scheduler.finished == 40
+
+
+def test_scheduler_cancels_timed_out_sessions():
+    backend: SimulatedBackend = SimulatedBackend(duration=lambda job: 10. if job % 5 == 0 else .01)
+    scheduler: SessionScheduler = SessionScheduler(backend=backend, concurrency=5, session_timeout=.1, poll_interval=.01)
+    scheduler.run(jobs=range(20))
+
+    assert sorted(backend.cancelled) == [0, 5, 10, 15]
+    assert scheduler.timed_out == 4
+    assert len(backend.completed) == 16
+
+
+def test_scheduler_keeps_polling_while_launches_are_paused():
+    backend: PausedBackend = PausedBackend(paused_for=.1, duration=lambda job: .01)
+    scheduler: SessionScheduler = SessionScheduler(backend=backend, concurrency=2, poll_interval=.01)
+    started: float = time.monotonic()
+    scheduler.run(jobs=range(4))
+
+    assert time.monotonic() - started >= .1
+    assert backend.polls_while_paused > 0
+    assert sorted(backend.completed) == list(range(4))
+
+
+def test_robot_delivers_jobs_against_simulated_colvir(tmp_path):
+    root: str = str(tmp_path)
+    jobs: List[BranchInfo] = make_jobs(count=60, root=root, seed=1)
+    result: Dict = run_strategy(jobs=jobs, root=root, concurrency=5, order='plan', time_scale=.0002,
+                                error_rate=.05, launch_error_rate=.05, seed=1)
+
+    assert result['delivered'] + result['failed'] == 60
+    assert result['delivered'] >= 55
+    assert result['max_alive'] <= 5
+    assert sum(os.path.exists(os.path.join(b.final_save_path, b.final_name)) for b in jobs) == result['delivered']
+    assert not os.listdir(os.path.join(root, 'staging'))
+
+
+def test_simulated_desktop_reports_session_states(tmp_path):
+    root: str = str(tmp_path)
+    branch_info: BranchInfo = make_jobs(count=1, root=root, seed=1)[0]
+    desktop: SimulatedDesktop = SimulatedDesktop(time_scale=0., seed=1)
+    pid: int = desktop.open_session(branch_info=branch_info, pids=[], restricted_pids=[])
+    deadline: float = time.monotonic() + 5
+    while desktop.get_session_state(pid=pid) == SessionState.RUNNING and time.monotonic() < deadline:
+        time.sleep(.01)
+
+    assert desktop.get_session_state(pid=pid) == SessionState.READY
+    assert os.path.exists(os.path.join(branch_info.save_path, f'{pid}_{branch_info.file_name}'))
+    desktop.kill(pid=pid)
+    assert desktop.get_session_state(pid=pid) == SessionState.GONE
+    desktop.close()
@@ -0,0 +1,138 @@
+import os
+import struct
+from types import SimpleNamespace
+from typing import List, Tuple
+import pytest
+from desktop import WindowsDesktop
+from xls_reader import BOF, BOUNDSHEET, CFB_SIGNATURE, END_OF_CHAIN, EOF, FONT, FREE_SECTOR, WINDOW1, XF, CompoundFile, \
+    XlsReader
+
+SECTOR_SIZE: int = 512
+FAT_SECTOR: int = 0xFFFFFFFD
+SST: int = 0x00FC
+CONTINUE: int = 0x003C
+LABELSST: int = 0x00FD
+STYLED_XF: int = 16
+
+
+def record(record_type: int, data: bytes) -> bytes:
+    return struct.pack('<HH', record_type, len(data)) + data
+
+
+def make_sst(strings_number: int) -> bytes:
+    strings: bytes = b''.join(struct.pack('<HB', 10, 0) + f'string_{i:03}'.encode()[:10] for i in range(strings_number))
+    data: bytes = struct.pack('<II', strings_number, strings_number) + strings
+    chunks: List[bytes] = [data[i:i + 8224] for i in range(0, len(data), 8224)]
+    return record(SST, chunks[0]) + b''.join(record(CONTINUE, chunk) for chunk in chunks[1:])
+
+
+def make_workbook(cells: List[Tuple[int, int]], strings_number: int = 500) -> bytes:
+    plain_xf: bytes = struct.pack('<HHH', 0, 0, 0) + bytes(14)
+    styled_xf: bytes = struct.pack('<HHH', 0, 0, 0) + bytes(4) + b'\x11\x11\x00\x00' + bytes(6)
+    xfs: bytes = b''.join(record(XF, plain_xf) for _ in range(STYLED_XF)) + record(XF, styled_xf)
+    sheet: bytes = record(BOF, struct.pack('<HH', 0x0600, 0x0010) + bytes(12))
+    sheet += b''.join(record(LABELSST, struct.pack('<HHHI', row, 0, xf, 0)) for row, xf in cells)
+    sheet += record(EOF, b'')
+
+    def make_globals(sheet_offset: int) -> bytes:
+        return (record(BOF, struct.pack('<HH', 0x0600, 0x0005) + bytes(12))
+                + record(WINDOW1, bytes(18))
+                + record(FONT, struct.pack('<HHH', 200, 0, 0x7FFF) + bytes(8) + b'\x05\x00Arial')
+                + xfs
+                + record(BOUNDSHEET, struct.pack('<IBB', sheet_offset, 0, 0) + b'\x06\x00Sheet1')
+                + make_sst(strings_number=strings_number)
+                + record(EOF, b''))
+
+    return make_globals(sheet_offset=len(make_globals(sheet_offset=0))) + sheet
+
+
+def make_compound_file(stream: bytes) -> bytes:
+    stream += bytes(-len(stream) % SECTOR_SIZE)
+    stream_sectors: int = len(stream) // SECTOR_SIZE
+    per_sector: int = SECTOR_SIZE // 4
+    fat_sectors: int = 1
+    while stream_sectors + 1 + fat_sectors > fat_sectors * per_sector:
+        fat_sectors += 1
+    dir_sector: int = stream_sectors
+
+    fat: List[int] = list(range(1, stream_sectors)) + [END_OF_CHAIN, END_OF_CHAIN] + [FAT_SECTOR] * fat_sectors
+    fat += [FREE_SECTOR] * (fat_sectors * per_sector - len(fat))
+
+    def entry(name: str, entry_type: int, start: int, size: int) -> bytes:
+        encoded: bytes = (name + '\0').encode('utf-16-le')
+        return (encoded + bytes(64 - len(encoded)) + struct.pack('<HB', len(encoded), entry_type) + bytes(49)
+                + struct.pack('<IQ', start, size))
+
+    directory: bytes = entry('Root Entry', 5, END_OF_CHAIN, 0) + entry('Workbook', 2, 0, len(stream))
+    directory += bytes(SECTOR_SIZE - len(directory))
+
+    difat: List[int] = list(range(dir_sector + 1, dir_sector + 1 + fat_sectors))
+    header: bytes = (CFB_SIGNATURE + bytes(16) + struct.pack('<HHHHH', 0x3E, 3, 0xFFFE, 9, 6) + bytes(10)
+                     + struct.pack('<IIIIIIII', fat_sectors, dir_sector, 0, 4096, END_OF_CHAIN, 0, END_OF_CHAIN, 0)
+                     + struct.pack('<109I', *(difat + [FREE_SECTOR] * (109 - len(difat)))))
+    return header + stream + directory + struct.pack(f'<{len(fat)}I', *fat)
+
+
+def write_xls(tmp_path, cells: List[Tuple[int, int]], **kwargs) -> str:
+    path: str = os.path.join(str(tmp_path), '1_export.xls')
+    with open(file=path, mode='wb') as f:
+        f.write(make_compound_file(stream=make_workbook(cells=cells, **kwargs)))
+    return path
+
+
+def test_empty_sheet(tmp_path):
+    assert not XlsReader(file_path=write_xls(tmp_path, cells=[])).has_styled_cells()
+
+
+def test_plain_cells_are_not_data(tmp_path):
+    assert not XlsReader(file_path=write_xls(tmp_path, cells=[(0, 15), (1, 0), (2, 15)])).has_styled_cells()
+
+
+def test_styled_cell_on_second_row(tmp_path):
+    path: str = write_xls(tmp_path, cells=[(0, 15), (1, STYLED_XF)])
+    assert XlsReader(file_path=path).has_styled_cells()
+
+
+def test_data_beyond_scanned_range(tmp_path):
+    path: str = write_xls(tmp_path, cells=[(0, 15), (60, STYLED_XF)])
+    assert not XlsReader(file_path=path).has_styled_cells(max_row=50)
+    assert XlsReader(file_path=path).has_styled_cells(max_row=100)
+
+
+def test_multi_sector_fat_and_sst(tmp_path):
+    path: str = write_xls(tmp_path, cells=[(3, STYLED_XF)], strings_number=5000)
+    with open(file=path, mode='rb') as f:
+        assert len(CompoundFile(file=f).fat_sectors) > 1
+    assert XlsReader(file_path=path).has_styled_cells()
+
+
+@pytest.mark.parametrize('data', [b'', b'not an excel file', CFB_SIGNATURE + bytes(100)])
+def test_non_ole_files_are_rejected(tmp_path, data):
+    path: str = os.path.join(str(tmp_path), '1_export.xls')
+    with open(file=path, mode='wb') as f:
+        f.write(data)
+    with pytest.raises(ValueError):
+        XlsReader(file_path=path).has_styled_cells()
+
+
+@pytest.mark.parametrize('size', [1024, 4096, 20000])
+def test_truncated_files_are_rejected(tmp_path, size):
+    path: str = write_xls(tmp_path, cells=[(1, STYLED_XF)], strings_number=5000)
+    with open(file=path, mode='r+b') as f:
+        f.truncate(size)
+    with pytest.raises(ValueError):
+        XlsReader(file_path=path).has_styled_cells()
+
+
+def test_unreadable_files_fall_back_to_excel(tmp_path):
+    path: str = os.path.join(str(tmp_path), '1_export.xls')
+    with open(file=path, mode='wb') as f:
+        f.write(b'<html>not a BIFF8 workbook</html>')
+    checked: List[str] = []
+    desktop: SimpleNamespace = SimpleNamespace(validate_export_excel=lambda full_path: checked.append(full_path) or True)
+    assert WindowsDesktop.validate_export(desktop, full_path=path)
+    assert checked == [path]
+
+    path = write_xls(tmp_path, cells=[])
+    assert not WindowsDesktop.validate_export(desktop, full_path=path)
+    assert checked == [os.path.join(str(tmp_path), '1_export.xls')]